@@ -0,0 +1,188 @@
+import queue
+import struct
+import time
+from multiprocessing import Event, Lock, Semaphore
+from multiprocessing.shared_memory import SharedMemory
+from typing import Optional
+
+# Shared memory layout: [head:u32][pad:60][tail:u32][pad:60][done:u32][pad:60][slots:16*capacity]
+# head, tail and done sit on separate 64 byte cache lines, so the consumer, the producers and the ACK reader
+# don't invalidate each other's line
+HEAD_OFFSET = 0
+TAIL_OFFSET = 64
+DONE_OFFSET = 128
+SLOTS_OFFSET = 192
+
+# Each slot is a length byte followed by up to 15 bytes of ASCII command, e.g. b"\x04FW10"
+SLOT_SIZE = 16
+MAX_COMMAND_LENGTH = SLOT_SIZE - 1
+
+U32 = struct.Struct("=I")
+U32_MASK = 0xFFFFFFFF
+
+
+class CommandRing:
+    """
+    Fixed-capacity ring of short STM32/Pi commands in shared memory, with the put/get/get_nowait/empty surface
+    of the queue it replaces.
+    head (next slot to read) and tail (next slot to write) are free-running u32 counters, a slot index is the counter
+    masked with capacity - 1. done counts the commands marked finished with task_done() plus those dropped by
+    clear()/replace_with(), so join() returns once done catches up with tail.
+    Must be created before the child processes are forked.
+    """
+
+    def __init__(self, capacity: int = 64):
+        if capacity <= 0 or capacity & (capacity - 1):
+            raise ValueError(f"capacity must be a power of two, got {capacity}")
+
+        self.capacity = capacity
+        self.mask = capacity - 1
+
+        # fresh shared memory is zero-filled, so head == tail == done == 0
+        self.shm = SharedMemory(create=True, size=SLOTS_OFFSET + capacity * SLOT_SIZE)
+        self.buf = self.shm.buf
+
+        # several processes put (recv_android, rpi_action, fastest_car), so index updates are still serialised.
+        # Both are futex-backed, there is no manager process in the path
+        self.lock = Lock()
+        self.items = Semaphore(0)  # one permit per put, command_follower blocks on it instead of polling
+        self.all_done = Event()  # set while every queued command has been marked done
+        self.all_done.set()
+
+    def _head(self) -> int:
+        return U32.unpack_from(self.buf, HEAD_OFFSET)[0]
+
+    def _tail(self) -> int:
+        return U32.unpack_from(self.buf, TAIL_OFFSET)[0]
+
+    def _done(self) -> int:
+        return U32.unpack_from(self.buf, DONE_OFFSET)[0]
+
+    def _drop_queued(self, head: int, tail: int) -> None:
+        # commands dropped before reaching the consumer will never be acknowledged, count them as done
+        U32.pack_into(self.buf, DONE_OFFSET, (self._done() + ((tail - head) & U32_MASK)) & U32_MASK)
+
+    def _write_slot(self, index: int, command: str) -> None:
+        data = command.encode("ascii")
+        if len(data) > MAX_COMMAND_LENGTH:
+            raise ValueError(f"Command too long for a ring slot: {command}")
+
+        offset = SLOTS_OFFSET + (index & self.mask) * SLOT_SIZE
+        self.buf[offset] = len(data)
+        self.buf[offset + 1:offset + 1 + len(data)] = data
+
+    def put(self, command: str) -> None:
+        with self.lock:
+            head, tail = self._head(), self._tail()
+            if (tail - head) & U32_MASK >= self.capacity:
+                raise queue.Full
+
+            self._write_slot(tail, command)
+
+            # publish the slot only after it is fully written
+            U32.pack_into(self.buf, TAIL_OFFSET, (tail + 1) & U32_MASK)
+            self.all_done.clear()
+
+        self.items.release()
+
+    def put_many(self, commands) -> None:
+        """
+        Queue a sequence of commands in one step, the consumer sees either none or all of them
+        """
+        with self.lock:
+            head, tail = self._head(), self._tail()
+            if ((tail - head) & U32_MASK) + len(commands) > self.capacity:
+                raise queue.Full
+
+            for i, command in enumerate(commands):
+                self._write_slot(tail + i, command)
+
+            # one tail store publishes the whole batch
+            U32.pack_into(self.buf, TAIL_OFFSET, (tail + len(commands)) & U32_MASK)
+            if commands:
+                self.all_done.clear()
+
+        for _ in commands:
+            self.items.release()
+
+    def replace_with(self, command: str) -> None:
+        """
+        Drop every queued command and queue this one instead, in one step.
+        Unlike clear() followed by put(), the consumer can never pick up a stale command in between
+        """
+        with self.lock:
+            # clear() and put() under one lock: skip the queued commands, then append after them,
+            # so tail and done only ever move forward
+            head, tail = self._head(), self._tail()
+            self._drop_queued(head, tail)
+            U32.pack_into(self.buf, HEAD_OFFSET, tail)
+            self._write_slot(tail, command)
+            U32.pack_into(self.buf, TAIL_OFFSET, (tail + 1) & U32_MASK)
+            self.all_done.clear()
+
+        self.items.release()
+
+    def clear(self) -> None:
+        """
+        Drop every queued command, O(1) as only the head index moves
+        """
+        with self.lock:
+            head, tail = self._head(), self._tail()
+            self._drop_queued(head, tail)
+            U32.pack_into(self.buf, HEAD_OFFSET, tail)
+            if self._done() == tail:
+                self.all_done.set()
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> str:
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not self.items.acquire(block, remaining):
+                raise queue.Empty
+
+            with self.lock:
+                head, tail = self._head(), self._tail()
+                if head != tail:
+                    offset = SLOTS_OFFSET + (head & self.mask) * SLOT_SIZE
+                    length = self.buf[offset]
+                    command = bytes(self.buf[offset + 1:offset + 1 + length]).decode("ascii")
+                    U32.pack_into(self.buf, HEAD_OFFSET, (head + 1) & U32_MASK)
+                    return command
+
+            # clear() and replace_with() drop commands without taking their permits, skip the stale permit
+
+    def get_nowait(self) -> str:
+        return self.get(block=False)
+
+    def task_done(self) -> None:
+        """
+        Mark the oldest command taken by get() as finished, e.g. on its ACK from the STM32.
+        Ignored when no taken command is outstanding, so stray ACKs can't run ahead of the queue
+        """
+        with self.lock:
+            done = self._done()
+            if done == self._head():
+                return
+
+            done = (done + 1) & U32_MASK
+            U32.pack_into(self.buf, DONE_OFFSET, done)
+            if done == self._tail():
+                self.all_done.set()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until every queued command has been marked done, returns False if timeout passes first
+        """
+        return self.all_done.wait(timeout)
+
+    def empty(self) -> bool:
+        return self._head() == self._tail()
+
+    def unlink(self) -> None:
+        """
+        Release the shared memory block, only to be called once every process is done with the ring
+        """
+        self.buf = None
+        self.shm.close()
+        self.shm.unlink()
@@ -1,46 +1,86 @@
-import requests
-import json
-
-# Specify the URL of the server's image endpoint
-# url = "http://localhost:5000/image"
-url_image = "http://localhost:5001/image"
-url_stitch = "http://localhost:5001/stitch"
-
-# Specify the path to the image file you want to upload
-# image_path = "/Users/hippoeug/Desktop/MDP/SERVER_W8/self_uploaded/time_36_L.jpg"
-# image_path = "/Users/hippoeug/Desktop/MDP/SERVER_W8/self_uploaded/time_37_L.jpg"
-# image_path = "/Users/hippoeug/Desktop/MDP/SERVER_W8/self_uploaded/time_38_L.jpg"
-# image_path = "/Users/hippoeug/Desktop/MDP/SERVER_W8/self_uploaded/time_39_L.jpg"
-image_path = "/Users/hippoeug/Desktop/MDP/SERVER_W8/self_uploaded/complicated_69_L.jpg"
-# image_path = "/Users/hippoeug/Desktop/MDP/SERVER_W8/self_uploaded/time_bullseye_L.jpg"
-
-# Read the content of the image file as bytes
-with open(image_path, "rb") as f:
-    image_data = f.read()
-
-# Make the POST request to the server, FOR IMAGE
-# response = requests.post(url_image, files={"file": ("time_36_L.jpg", image_data)})
-response = requests.post(url_image, files={"file": ("complicated_69_L.jpg", image_data)})
-# response = requests.post(url_image, files={"file": ("time_bullseye_L.jpg", image_data)})
-
-# Make the GET request to the server, FOR STITCH
-# response = requests.get(url_stitch)
-
-# Print the server's response
-try:
-    # print(response.json())
-    results = json.loads(response.content)
-    image_id = results['image_id']
-
-    # response_data = response.json()
-    # image_id = response_data['image_id']
-    print(image_id)
-
-    if image_id == "38":
-        print("RIGHT ARROW")
-    elif image_id == "39":
-        print("LEFT ARROW")
-    else:
-        print("NO ARROW")
-except requests.exceptions.JSONDecodeError:
-    print("Non-JSON response:", response.text)
\ No newline at end of file
+import asyncio
+import io
+import os
+import aiohttp
+from PIL import Image
+
+# Specify the URL of the server's image endpoint
+# url = "http://localhost:5000/image"
+url_image = "http://localhost:5001/image"
+url_stitch = "http://localhost:5001/stitch"
+
+# Image ids of the arrow symbols, anything else is printed as "NO ARROW"
+LABELS = {
+    "38": "RIGHT ARROW",
+    "39": "LEFT ARROW",
+}
+
+# Specify the paths to the image files you want to upload, they are all uploaded concurrently
+image_paths = [
+    # "/Users/hippoeug/Desktop/MDP/SERVER_W8/self_uploaded/time_36_L.jpg",
+    # "/Users/hippoeug/Desktop/MDP/SERVER_W8/self_uploaded/time_37_L.jpg",
+    # "/Users/hippoeug/Desktop/MDP/SERVER_W8/self_uploaded/time_38_L.jpg",
+    # "/Users/hippoeug/Desktop/MDP/SERVER_W8/self_uploaded/time_39_L.jpg",
+    "/Users/hippoeug/Desktop/MDP/SERVER_W8/self_uploaded/complicated_69_L.jpg",
+    # "/Users/hippoeug/Desktop/MDP/SERVER_W8/self_uploaded/time_bullseye_L.jpg",
+]
+
+# Re-encode the image at JPEG quality 80 before uploading, roughly halves the size of camera JPEGs on slow links
+compress_upload = True
+
+
+def open_image(image_path):
+    """
+    Open the image file to upload as a file object, re-encoded in memory if compress_upload is set
+    """
+    if compress_upload:
+        buf = io.BytesIO()
+        Image.open(image_path).convert("RGB").save(buf, "JPEG", quality=80, optimize=True, progressive=True)
+        buf.seek(0)
+        return buf
+
+    # Upload straight from the file, aiohttp streams it in chunks instead of reading the whole image into memory first
+    return open(image_path, "rb")
+
+
+async def upload(session, image_path):
+    """
+    Make the POST request to the server, FOR IMAGE
+    The image is sent as the raw request body and the filename in a header, so no multipart encoding is needed
+    """
+    headers = {"X-Filename": os.path.basename(image_path), "Content-Type": "application/octet-stream"}
+    with open_image(image_path) as data:
+        async with session.post(url_image, data=data, headers=headers) as response:
+            try:
+                return await response.json()
+            except aiohttp.ContentTypeError:
+                print("Non-JSON response:", await response.text())
+                return None
+
+
+async def upload_all(paths):
+    # One pooled session for all uploads, so the requests overlap over up to 8 keep-alive connections
+    connector = aiohttp.TCPConnector(limit=8)
+    timeout = aiohttp.ClientTimeout(total=30)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        return await asyncio.gather(*(upload(session, p) for p in paths))
+
+
+async def stitch():
+    # Make the GET request to the server, FOR STITCH
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url_stitch) as response:
+            return await response.json()
+
+
+# asyncio.run(stitch())
+
+# Print the server's responses
+for results in asyncio.run(upload_all(image_paths)):
+    if results is None:
+        continue
+
+    image_id = results['image_id']
+    print(image_id)
+
+    print(LABELS.get(image_id, "NO ARROW"))
@@ -1,16 +1,100 @@
+import atexit
 import time
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+import asyncio
+import gzip
+import hashlib
+import logging
+import re
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
+from queue import Queue
+from quart import Quart, request, jsonify, abort
+from quart_cors import cors
+from streaming_form_data import StreamingFormDataParser
+from streaming_form_data.targets import ValueTarget
 from model import *
 
-app = Flask(__name__)
-CORS(app)
+# Handlers only enqueue log records, a background listener thread formats and writes them, so no request waits on stderr
+log_queue = Queue(-1)
+logging.root.addHandler(QueueHandler(log_queue))
+logging.root.setLevel(logging.INFO)
+log_listener = QueueListener(log_queue, logging.StreamHandler())
+log_listener.start()
+atexit.register(log_listener.stop)
 
-# model = load_model() # Needed for week 8???
-model = None  # Week 9???
+logger = logging.getLogger(__name__)
+
+app = Quart(__name__)
+app = cors(app)
+
+# Uploads are read into memory as they stream in, reject anything larger than this
+app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
+
+# Responses smaller than this are not worth gzipping
+app.config['COMPRESS_MIN_SIZE'] = 200
+
+# Load the model once at startup, so no request pays for loading it
+model = load_model()
+
+# Recent predictions keyed by (sha256 of the image, signal), so re-uploads of the same image skip inference.
+# A cache hit also skips predict_image's annotated copies under runs/ and own_results/, so /stitch only shows
+# the first upload of an identical image, and leaves it out entirely if it was re-uploaded after the last stitch
+PREDICTION_CACHE_SIZE = 128
+prediction_cache = OrderedDict()
+
+# filename format: "<timestamp>_<obstacle_id>_<signal>.jpg", captures obstacle_id and signal
+FILENAME_PATTERN = re.compile(r'[^_]*_([^_]*)_([^_]*)')
+
+# A single background thread writes the uploaded images to disk, off the request path
+upload_writer = ThreadPoolExecutor(max_workers=1)
+
+# Inference gets its own pool so at most 2 predictions run at once per worker, and /status is never stuck behind them
+inference_executor = ThreadPoolExecutor(max_workers=2)
+INFERENCE_TIMEOUT = 10
+
+def save_upload(path, data):
+    """
+    Save a copy of the uploaded image, run on the upload writer as inference reads the image from memory
+    """
+    # Unbuffered os.write straight from the request bytes, no copy into a file object buffer
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+def log_save_failure(future, path):
+    """
+    Done callback for save_upload, the request has already been answered so a failed save can only be logged
+    """
+    error = future.exception()
+    if error is not None:
+        logger.error("Failed to save upload to %s: %s", path, error)
+
+@app.after_request
+async def compress_response(response):
+    """
+    Gzip responses of at least COMPRESS_MIN_SIZE bytes for clients that accept it.
+    Quart already sends a Content-Length for these bodies, so keep-alive connections are reused without chunking
+    """
+    if response.status_code != 200 or 'Content-Encoding' in response.headers \
+            or 'gzip' not in request.headers.get('Accept-Encoding', ''):
+        return response
+
+    data = await response.get_data()
+    if len(data) < app.config['COMPRESS_MIN_SIZE']:
+        return response
+
+    response.set_data(gzip.compress(data))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
 
 @app.route('/status', methods=['GET'])
-def status():
+async def status():
     """
     This is a health check endpoint to check if the server is running
     :return: a json object with a key "result" and value "ok"
@@ -18,24 +102,64 @@ def status():
     return jsonify({"result": "ok"})
 
 @app.route('/image', methods=['POST'])
-def image_predict():
+async def image_predict():
     """
     This is the main endpoint for the image prediction algorithm
     :return: a json object with a key "result" and value a dictionary with keys "obstacle_id" and "image_id"
     """
-    file = request.files['file']
-    filename = file.filename
-    print("filename: ", filename)
+    filename = request.headers.get('X-Filename')
+    if filename is not None:
+        # Raw image body with the filename in a header, skips multipart parsing entirely
+        data = bytearray()
+        async for chunk in request.body:
+            data += chunk
+    else:
+        # Multipart upload, as sent by the RPi, parsed chunk by chunk as the body streams in
+        parser = StreamingFormDataParser(headers=request.headers)
+        target = ValueTarget()
+        parser.register('file', target)
+        async for chunk in request.body:
+            parser.data_received(chunk)
+        filename = target.multipart_filename
+        data = target.value
+        if filename is None:
+            abort(400)
+    # the name comes from the client, keep only its last component so it can't point outside uploads/,
+    # and reject anything not in the expected format before it is written anywhere
+    filename = os.path.basename(filename)
+    logger.info("filename: %s", filename)
+    match = FILENAME_PATTERN.match(filename)
+    if match is None:
+        abort(400)
+    obstacle_id = match.group(1)
     
     # file.save(os.path.join('C:/Users/efoo1/Desktop/CZ3004-SC2079-MDP-ImageRecognition-main/YOLOv5 Inference Server/uploads', filename))
-    file.save(os.path.join('/Users/hippoeug/Desktop/MDP/image_rec/uploads', filename))
+    path = os.path.join('/Users/hippoeug/Desktop/MDP/image_rec/uploads', filename)
+    upload_writer.submit(save_upload, path, data).add_done_callback(lambda future: log_save_failure(future, path))
     
-    # filename format: "<timestamp>_<obstacle_id>_<signal>.jpeg"
-    constituents = file.filename.split("_")
-    obstacle_id = constituents[1]
-    
-    signal = constituents[2].strip(".jpg")
-    image_id = predict_image(filename, model, signal) # Check model here
+    # removesuffix, as strip(".jpg") would also eat any trailing '.', 'j', 'p' or 'g' of the signal itself
+    signal = match.group(2).removesuffix(".jpg")
+    key = (hashlib.sha256(data).hexdigest(), signal)
+    image_id = prediction_cache.get(key)
+    if image_id is not None:
+        # nothing is saved for the stitch on a hit, see prediction_cache
+        prediction_cache.move_to_end(key)
+    else:
+        # Run inference on the inference pool so the event loop keeps accepting uploads meanwhile
+        loop = asyncio.get_running_loop()
+        try:
+            image_id = await asyncio.wait_for(
+                loop.run_in_executor(inference_executor, predict_image, filename, data, model, signal), # Check model here
+                INFERENCE_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("Inference took longer than %ss, Final result: NA", INFERENCE_TIMEOUT)
+            image_id = 'NA'
+
+        # Don't cache 'NA', it is also returned when inference failed
+        if image_id != 'NA':
+            prediction_cache[key] = image_id
+            if len(prediction_cache) > PREDICTION_CACHE_SIZE:
+                prediction_cache.popitem(last=False)
 
     # Return the obstacle_id and image_id
     result = {
@@ -45,16 +169,19 @@ def image_predict():
     return jsonify(result)
 
 @app.route('/stitch', methods=['GET'])
-def stitch():
+async def stitch():
     """
     This is the main endpoint for the stitching command. Stitches the images using two different functions, in effect creating two stitches, just for redundancy purposes
     """
-    img = stitch_image()
+    loop = asyncio.get_running_loop()
+    img = await loop.run_in_executor(None, stitch_image)
     img.show()
     # img2 = stitch_image_own()
     # img2.show()
     return jsonify({"result": "ok"})
 
 if __name__ == '__main__':
-    # app.run(host='0.0.0.0', port=5000, debug=True)
-    app.run(host='0.0.0.0', port=5001, debug=True)
+    # Development server only, for concurrent clients run under Hypercorn instead:
+    # hypercorn --config hypercorn.toml main:app
+    # app.run(host='0.0.0.0', port=5000)
+    app.run(host='0.0.0.0', port=5001)
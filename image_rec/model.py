@@ -1,7 +1,9 @@
+import io
 import os
 import shutil
 import time
 import glob
+import logging
 import torch
 from PIL import Image
 import cv2
@@ -10,6 +12,79 @@ import string
 import numpy as np
 import random
 
+logger = logging.getLogger(__name__)
+
+# Maps every label name the model can output to its image id
+NAME_TO_ID = {
+    "NA": 'NA',
+    "Bullseye": 10,
+    "id99": 99,
+    "One": 11,
+    "id11": 11,
+    "Two": 12,
+    "id12": 12,
+    "Three": 13,
+    "id13": 13,
+    "Four": 14,
+    "id14": 14,
+    "Five": 15,
+    "id15": 15,
+    "Six": 16,
+    "id16": 16,
+    "Seven": 17,
+    "id17": 17,
+    "Eight": 18,
+    "id18": 18,
+    "Nine": 19,
+    "id19": 19,
+    "A": 20,
+    "id20": 20,
+    "B": 21,
+    "id21": 21,
+    "C": 22,
+    "id22": 22,
+    "D": 23,
+    "id23": 23,
+    "E": 24,
+    "id24": 24,
+    "F": 25,
+    "id25": 25,
+    "G": 26,
+    "id26": 26,
+    "H": 27,
+    "id27": 27,
+    "S": 28,
+    "id28": 28,
+    "T": 29,
+    "id29": 29,
+    "U": 30,
+    "id30": 30,
+    "V": 31,
+    "id31": 31,
+    "W": 32,
+    "id32": 32,
+    "X": 33,
+    "id33": 33,
+    "Y": 34,
+    "id34": 34,
+    "Z": 35,
+    "id35": 35,
+    "Up": 36,
+    "id36": 36,
+    "Up Arrow": 36,
+    "Down": 37,
+    "id37": 37,
+    "Down Arrow": 37,
+    "Right": 38,
+    "id38": 38,
+    "Right Arrow": 38,
+    "Left": 39,
+    "id39": 39,
+    "Left Arrow": 39,
+    "Stop": 40,
+    "id40": 40
+}
+
 def get_random_string(length):
     """
     Generate a random string of fixed length 
@@ -28,12 +103,18 @@ def get_random_string(length):
 
 def load_model():
     """
-    Load the model from the local directory
+    Load the model from the local directory, on the GPU in half precision if one is available
     """
     model_path = '/Users/hippoeug/Desktop/MDP/image_rec/Weights/best.pt'
 
     # model = torch.hub.load('/', 'custom', path=model_path, source='local')
     model = torch.hub.load('/Users/hippoeug/Desktop/MDP/image_rec/yolov5', 'custom', path=model_path, source='local')
+    model.eval()
+
+    if torch.cuda.is_available():
+        # Input size is fixed, so let cuDNN pick the fastest convolution algorithms once
+        torch.backends.cudnn.benchmark = True
+        model = model.to('cuda').half()
 
     return model
 
@@ -64,77 +145,8 @@ def draw_own_bbox(img,x1,y1,x2,y2,label,color=(36,255,12),text_color=(0,0,0)):
     None
 
     """
-    name_to_id = {
-        "NA": 'NA',
-        "Bullseye": 10,
-        "id99": 99,
-        "One": 11,
-        "id11": 11,
-        "Two": 12,
-        "id12": 12,
-        "Three": 13,
-        "id13": 13,
-        "Four": 14,
-        "id14": 14,
-        "Five": 15,
-        "id15": 15,
-        "Six": 16,
-        "id16": 16,
-        "Seven": 17,
-        "id17": 17,
-        "Eight": 18,
-        "id18": 18,
-        "Nine": 19,
-        "id19": 19,
-        "A": 20,
-        "id20": 20,
-        "B": 21,
-        "id21": 21,
-        "C": 22,
-        "id22": 22,
-        "D": 23,
-        "id23": 23,
-        "E": 24,
-        "id24": 24,
-        "F": 25,
-        "id25": 25,
-        "G": 26,
-        "id26": 26,
-        "H": 27,
-        "id27": 27,
-        "S": 28,
-        "id28": 28,
-        "T": 29,
-        "id29": 29,
-        "U": 30,
-        "id30": 30,
-        "V": 31,
-        "id31": 31,
-        "W": 32,
-        "id32": 32,
-        "X": 33,
-        "id33": 33,
-        "Y": 34,
-        "id34": 34,
-        "Z": 35,
-        "id35": 35,
-        "Up": 36,
-        "id36": 36,
-        "Up Arrow": 36,
-        "Down": 37,
-        "id37": 37,
-        "Down Arrow": 37,
-        "Right": 38,
-        "id38": 38,
-        "Right Arrow": 38,
-        "Left": 39,
-        "id39": 39,
-        "Left Arrow": 39,
-        "Stop": 40,
-        "id40": 40
-    }
     # Reformat the label to {label name}-{label id}
-    label = label + "-" + str(name_to_id[label])
+    label = label + "-" + str(NAME_TO_ID[label])
     # Convert the coordinates to int
     x1 = int(x1)
     x2 = int(x2)
@@ -158,7 +170,7 @@ def draw_own_bbox(img,x1,y1,x2,y2,label,color=(36,255,12),text_color=(0,0,0)):
     cv2.imwrite(f"own_results/annotated_image_{label}_{rand}.jpg", img)
 
 
-def predict_image(image, model, signal):
+def predict_image(image, image_bytes, model, signal):
     """
     Predict the image using the model and save the results in the 'runs' folder
     
@@ -166,6 +178,8 @@ def predict_image(image, model, signal):
     ------
     image: str - name of the image file
 
+    image_bytes: bytes - content of the image file
+
     model: torch.hub.load - model to be used for prediction
 
     signal: str - signal to be used for filtering the predictions
@@ -177,14 +191,16 @@ def predict_image(image, model, signal):
     try:
         # Load the image
         # img = Image.open(os.path.join('C:/Users/efoo1/Desktop/CZ3004-SC2079-MDP-ImageRecognition-main/YOLOv5 Inference Server/uploads', image))
-        img = Image.open(os.path.join('/Users/hippoeug/Desktop/MDP/image_rec/uploads', image))
-        print("image: ", img)
+        # img = Image.open(os.path.join('/Users/hippoeug/Desktop/MDP/image_rec/uploads', image))
+        img = Image.open(io.BytesIO(image_bytes))
+        # AutoShape names the saved results after img.filename, which is empty for an in-memory image
+        img.filename = image
+        logger.debug("image: %s %s", image, img)
 
-        # Predict the image using the model
-        model = load_model() # ADDED MANUALLY BY 330
+        # Predict the image using the model, loaded once when the server starts
         # print("model: ", model)
         results = model(img)
-        print("results: ", results)
+        logger.debug("results: %s", results)
 
         # Images with predicted bounding boxes are saved in the runs folder
         results.save('/Users/hippoeug/Desktop/MDP/image_rec/runs')
@@ -265,91 +281,21 @@ def predict_image(image, model, signal):
         if not isinstance(pred,str):
             draw_own_bbox(np.array(img), pred['xmin'], pred['ymin'], pred['xmax'], pred['ymax'], pred['name'])
 
-        name_to_id = {
-            # "NA": 'NA',
-            "Bullseye": 10,
-            "id99": 99,
-            "One": 11,
-            "id11": 11,
-            "Two": 12,
-            "id12": 12,
-            "Three": 13,
-            "id13": 13,
-            "Four": 14,
-            "id14": 14,
-            "Five": 15,
-            "id15": 15,
-            "Six": 16,
-            "id16": 16,
-            "Seven": 17,
-            "id17": 17,
-            "Eight": 18,
-            "id18": 18,
-            "Nine": 19,
-            "id19": 19,
-            "A": 20,
-            "id20": 20,
-            "B": 21,
-            "id21": 21,
-            "C": 22,
-            "id22": 22,
-            "D": 23,
-            "id23": 23,
-            "E": 24,
-            "id24": 24,
-            "F": 25,
-            "id25": 25,
-            "G": 26,
-            "id26": 26,
-            "H": 27,
-            "id27": 27,
-            "S": 28,
-            "id28": 28,
-            "T": 29,
-            "id29": 29,
-            "U": 30,
-            "id30": 30,
-            "V": 31,
-            "id31": 31,
-            "W": 32,
-            "id32": 32,
-            "X": 33,
-            "id33": 33,
-            "Y": 34,
-            "id34": 34,
-            "Z": 35,
-            "id35": 35,
-            "Up": 36,
-            "id36": 36,
-            "Up Arrow": 36,
-            "Down": 37,
-            "id37": 37,
-            "Down Arrow": 37,
-            "Right": 38,
-            "id38": 38,
-            "Right Arrow": 38,
-            "Left": 39,
-            "id39": 39,
-            "Left Arrow": 39,
-            "Stop": 40,
-            "id40": 40
-        }
         # If pred is not a string, i.e. a prediction was made and pred is not 'NA'
         if not isinstance(pred,str):
-            print("\npred in if not instance\n", pred)
-            image_id = str(name_to_id[pred['name']]) # Originally correct
+            logger.debug("pred in if not instance: %s", pred)
+            image_id = str(NAME_TO_ID[pred['name']]) # Originally correct
 
-            # image_id = str(name_to_id[pred]) # Temporarily added for testing
+            # image_id = str(NAME_TO_ID[pred]) # Temporarily added for testing
         else:
-            print("\npred in else\n", pred)
+            logger.debug("pred in else: %s", pred)
             image_id = 'NA'
 
-        print(f"Final result: {image_id}")
+        logger.info("Final result: %s", image_id)
         return image_id
     # If some error happened, we just return 'NA' so that the inference loop is closed
     except Exception as e:
-        print(f"ERROR!! EXCEPT! Final result: NA")
-        print(e)
+        logger.exception("ERROR!! EXCEPT! Final result: NA")
         return 'NA'
 
 def stitch_image():
@@ -380,9 +326,9 @@ def stitch_image():
     stitchedImg.save(stitchedPath)
 
     # Move original images to "originals" subdirectory
-    print("imagePaths: ", imgPaths)
+    logger.info("imagePaths: %s", imgPaths)
     for img in imgPaths:
-        print("img: ", img)
+        logger.debug("img: %s", img)
         shutil.move(img, "/Users/hippoeug/Desktop/MDP/image_rec/originals", os.path.basename(img))
 
     return stitchedImg
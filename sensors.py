@@ -1,70 +1,134 @@
-#Libraries
-import RPi.GPIO as GPIO
-import time
- 
-#GPIO Mode (BOARD / BCM)
-GPIO.setmode(GPIO.BCM)
- 
-#set GPIO Pins
-GPIO_TRIGGER = 11
-GPIO_ECHO = 12
-leftsensor = 23
-rightsensor = 24
-
- 
-#set GPIO direction (IN / OUT)
-GPIO.setup(GPIO_TRIGGER, GPIO.OUT)
-GPIO.setup(GPIO_ECHO, GPIO.IN)
-GPIO.setup(rightsensor,GPIO.IN)
-GPIO.setup(leftsensor,GPIO.IN)
- 
-def distance():
-    # set Trigger to HIGH
-    GPIO.output(GPIO_TRIGGER, True)
- 
-    # set Trigger after 0.01ms to LOW
-    time.sleep(0.00001)
-    GPIO.output(GPIO_TRIGGER, False)
- 
-    StartTime = time.time()
-    StopTime = time.time()
- 
-    # save StartTime
-    while GPIO.input(GPIO_ECHO) == 0:
-        StartTime = time.time()
- 
-    # save time of arrival
-    while GPIO.input(GPIO_ECHO) == 1:
-        StopTime = time.time()
- 
-    # time difference between start and arrival
-    TimeElapsed = StopTime - StartTime
-    # multiply with the sonic speed (34300 cm/s)
-    # and divide by 2, because there and back
-    distance = (TimeElapsed * 34300) / 2
- 
-    return distance
- 
-if __name__ == '__main__':
-    try:
-        while True:
-            dist = distance()
-            print ("Measured Distance = %.1f cm" % dist)
-            time.sleep(1)
- 
-        # Reset by pressing CTRL + C
-    except KeyboardInterrupt:
-        print("Measurement stopped by User")
-        GPIO.cleanup()
-
-def readR():
-	if GPIO.input(rightsensor):
-		return 1 # if anything is detected on the IR right sensor
-	else:
-		return 0 # if nothing is detected 
-	
-def readL():
-	if GPIO.input(leftsensor):
-		return 1 # if anything is detected on the IR left sensor
-	else:
-		return 0 # if nothing is detected
\ No newline at end of file
+#Libraries
+import RPi.GPIO as GPIO
+import atexit
+import statistics
+import threading
+import time
+from collections import deque
+ 
+#set GPIO Pins
+GPIO_TRIGGER = 11
+GPIO_ECHO = 12
+leftsensor = 23
+rightsensor = 24
+
+#max time to wait for an echo edge in ms (~30 ms covers the 4 m range of the sensor)
+ECHO_TIMEOUT = 30
+
+#echo pulse timestamps in ns, filled in by the edge callback
+echo_start = None
+echo_stop = None
+echo_done = threading.Event()
+
+#last few readings, distance(filtered=True) returns their median to filter out glitches
+readings = deque(maxlen=5)
+
+def echo_edge(channel):
+    global echo_start, echo_stop
+    now = time.perf_counter_ns()
+    # read the settled level instead of trusting the edge, the echo line can bounce
+    if GPIO.input(channel):
+        echo_start = now
+    elif echo_start is not None:
+        echo_stop = now
+        echo_done.set()
+
+#set once init_gpio() has configured the pins
+initialized = False
+init_lock = threading.Lock()
+
+def init_gpio():
+    """
+    Configure the GPIO pins on first use, so importing this module has no side effects
+    """
+    global initialized
+    if initialized:
+        return
+    with init_lock:
+        if initialized:
+            return
+
+        #GPIO Mode (BOARD / BCM)
+        GPIO.setmode(GPIO.BCM)
+
+        #set GPIO direction (IN / OUT)
+        GPIO.setup(GPIO_TRIGGER, GPIO.OUT)
+        GPIO.setup(GPIO_ECHO, GPIO.IN)
+        GPIO.setup(rightsensor,GPIO.IN)
+        GPIO.setup(leftsensor,GPIO.IN)
+
+        #no bouncetime, its 1 ms minimum would swallow the echo of anything closer than ~17 cm
+        GPIO.add_event_detect(GPIO_ECHO, GPIO.BOTH, callback=echo_edge)
+
+        #release the pins on exit, avoids "This channel is already in use" on the next run
+        atexit.register(GPIO.cleanup)
+        initialized = True
+ 
+def distance(filtered=False):
+    """
+    Measure the distance in cm with the ultrasonic sensor, -1 if no echo came back.
+    filtered returns the median of the last few readings instead, smoother but it lags a close obstacle
+    by a couple of readings, so don't use it for stopping
+    """
+    global echo_start, echo_stop
+    init_gpio()
+    echo_start = None
+    echo_stop = None
+    echo_done.clear()
+
+    # set Trigger to HIGH
+    GPIO.output(GPIO_TRIGGER, True)
+ 
+    # set Trigger after 0.01ms to LOW
+    time.sleep(0.00001)
+    GPIO.output(GPIO_TRIGGER, False)
+ 
+    # wait for the edge callback to see the whole echo pulse (rising then falling edge)
+    if not echo_done.wait(2 * ECHO_TIMEOUT / 1000):
+        return -1 # no echo received
+ 
+    # time difference between start and arrival, in seconds
+    TimeElapsed = (echo_stop - echo_start) * 1e-9
+    # multiply with the sonic speed (34300 cm/s)
+    # and divide by 2, because there and back
+    distance = (TimeElapsed * 34300) / 2
+ 
+    readings.append(distance)
+    if filtered:
+        return statistics.median(readings)
+    return distance
+ 
+if __name__ == '__main__':
+    try:
+        while True:
+            dist = distance()
+            print ("Measured Distance = %.1f cm" % dist)
+            time.sleep(1)
+ 
+        # Reset by pressing CTRL + C
+    except KeyboardInterrupt:
+        print("Measurement stopped by User")
+
+def readR():
+	init_gpio()
+	if GPIO.input(rightsensor):
+		return 1 # if anything is detected on the IR right sensor
+	else:
+		return 0 # if nothing is detected 
+	
+def readL():
+	init_gpio()
+	if GPIO.input(leftsensor):
+		return 1 # if anything is detected on the IR left sensor
+	else:
+		return 0 # if nothing is detected
+
+def watch_ir(pin, callback):
+    """
+    Call callback(level) with the IR sensor's level on every edge, from RPi.GPIO's event thread,
+    and once straight away with the current level
+    """
+    init_gpio()
+    # read the settled level instead of trusting the edge, same as echo_edge
+    GPIO.add_event_detect(pin, GPIO.BOTH, callback=lambda channel: callback(GPIO.input(channel)))
+    callback(GPIO.input(pin))
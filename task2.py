@@ -1,1418 +1,1152 @@
-#!/usr/bin/env python3
-
-import io
-import json
-import queue
-import time
-from multiprocessing import Process, Manager, Queue, Value
-import threading
-from typing import Optional, List
-
-import sensors
-
-import picamera
-import requests
-
-from communication.android import AndroidLink, AndroidMessage
-from communication.stm32 import STMLink
-from consts import SYMBOL_MAP
-from logger import prepare_logger
-from settings import API_IP, API_PORT, OUTDOOR_BIG_TURN, API_IMAGE_IP, API_IMAGE_PORT
-
-arrow_dir = "none"
-first_arrow_dir = "none"
-second_arrow_dir = "none"
-
-class PiAction:
-
-    """
-    Represents an action that the Pi is responsible for:
-    - Changing the robot's mode (manual/path)
-    - Requesting a path from the API
-    - Snapping an image and requesting the image-rec result from the API
-    """
-
-    def __init__(self, cat, value):
-        self._cat = cat
-        self._value = value
-
-    @property
-    def cat(self):
-        return self._cat
-
-    @property
-    def value(self):
-        return self._value
-
-
-class RaspberryPi:
-    def __init__(self):
-        # prepare logger
-        self.logger = prepare_logger()
-
-        # communication links
-        self.android_link = AndroidLink()
-        self.stm_link = STMLink()
-
-        # for sharing information between child processes
-        manager = Manager()
-
-        # 0: manual, 1: path (default: 1)
-        self.robot_mode = manager.Value('i', 0)
-
-        # events
-        self.android_dropped = manager.Event()  # set when the android link drops
-        self.unpause = manager.Event()  # commands will be retrieved from commands queue when this event is set
-
-        # movement lock, commands will only be sent to STM32 if this is released
-        self.movement_lock = manager.Lock()
-
-        # queues
-        self.android_queue = manager.Queue()
-        self.rpi_action_queue = manager.Queue()
-        self.command_queue = manager.Queue()
-        self.path_queue = manager.Queue()
-
-        # define processes
-        self.proc_recv_android = None
-        self.proc_recv_stm32 = None
-        self.proc_android_sender = None
-        self.proc_command_follower = None
-        self.proc_rpi_action = None
-
-        # define threads
-        self.thread_set_us_flag = None
-        self.thread_set_irl_flag = None
-        self.thread_set_irr_flag = None
-
-        # define shared data
-        self.ultrasonic_is_clear = Value('i', 1)  # variable to check if obstacle is near using US, shared between processes
-        self.ultrasonic_is_clear_samula = Value('i', 1)
-        self.ir_left_is_clear = Value('i', 1) # variable to check if obstacle is near using left IR, shared between processes
-        self.ir_right_is_clear = Value('i', 1) # variable to check if obstacle is near using right IR, shared between processes
-        self.total_xdist = Value('i', 0)
-        self.total_ytime = Value('f', 0)
-
-        self.compensate_ydist = Value('f', 0)
-        self.between_obstacles_ydist = Value('i', 0)
-
-    def start(self):
-        try:
-            # establish bluetooth connection with Android
-            self.android_link.connect()
-            self.android_queue.put(AndroidMessage('info', 'You are connected to the RPi!'))
-
-            # establish connection with STM32
-            self.stm_link.connect()
-
-            # check api status
-            self.check_api()
-
-            # define processes
-            self.proc_recv_android = Process(target=self.recv_android)
-            self.proc_recv_stm32 = Process(target=self.recv_stm)
-            self.proc_android_sender = Process(target=self.android_sender)
-            self.proc_command_follower = Process(target=self.command_follower)
-            self.proc_rpi_action = Process(target=self.rpi_action)
-
-            # start processes
-            self.proc_recv_android.start()
-            self.proc_recv_stm32.start()
-            self.proc_android_sender.start()
-            self.proc_command_follower.start()
-            self.proc_rpi_action.start()
-
-            # define threads
-            self.thread_set_us_flag = threading.Thread(target=self.set_us_flag)
-            self.thread_set_irl_flag = threading.Thread(target=self.set_irl_flag)
-            self.thread_set_irr_flag = threading.Thread(target=self.set_irr_flag)
-
-            # start threads
-            self.thread_set_us_flag.start()
-            self.thread_set_irl_flag.start()
-            self.thread_set_irr_flag.start()
-
-            self.logger.info("Child Processes started")
-            self.android_queue.put(AndroidMessage('info', 'Robot is ready!'))
-            self.android_queue.put(AndroidMessage('mode', 'path' if self.robot_mode.value == 1 else 'manual'))
-
-            # buzz STM32 (2 times)
-            self.stm_link.send("ZZ02")
-
-            # reconnect handler to watch over android connection
-            self.reconnect_android()
-
-        except KeyboardInterrupt:
-            self.stop()
-
-    def stop(self):
-        self.android_link.disconnect()
-        self.stm_link.disconnect()
-        self.logger.info("Program exited!")
-
-    def reconnect_android(self):
-        self.logger.info("Reconnection handler is watching...")
-
-        while True:
-            # wait for android connection to drop
-            self.android_dropped.wait()
-
-            self.logger.error("Android link is down!")
-
-            # buzz STM32 (3 times)
-            self.stm_link.send("ZZ03")
-
-            # kill child processes
-            self.logger.debug("Killing android child processes")
-            self.proc_android_sender.kill()
-            self.proc_recv_android.kill()
-
-            # wait for the child processes to finish
-            self.proc_android_sender.join()
-            self.proc_recv_android.join()
-            assert self.proc_android_sender.is_alive() is False
-            assert self.proc_recv_android.is_alive() is False
-            self.logger.debug("Android child processes killed")
-
-            # clean up old sockets
-            self.android_link.disconnect()
-
-            # reconnect
-            self.android_link.connect()
-
-            # recreate android processes
-            self.proc_recv_android = Process(target=self.recv_android)
-            self.proc_android_sender = Process(target=self.android_sender)
-
-            # start processes
-            self.proc_recv_android.start()
-            self.proc_android_sender.start()
-
-            self.logger.info("Android child processes restarted")
-            self.android_queue.put(AndroidMessage("info", "You are reconnected!"))
-            self.android_queue.put(AndroidMessage('mode', 'path' if self.robot_mode.value == 1 else 'manual'))
-
-            # buzz STM32 (2 times)
-            self.stm_link.send("ZZ02")
-
-            self.android_dropped.clear()
-
-    def recv_android(self) -> None:
-        while True:
-            msg_str: Optional[str] = None
-            try:
-                msg_str = self.android_link.recv()
-            except OSError:
-                self.android_dropped.set()
-                self.logger.debug("Event set: Android connection dropped")
-
-            # if an error occurred in recv()
-            if msg_str is None:
-                continue
-
-            message: dict = json.loads(msg_str)
-
-            self.logger.debug(f"message: {message}")
-
-            # change mode command
-            if message['cat'] == "mode":
-                self.rpi_action_queue.put(PiAction(**message))
-                self.logger.debug(f"Change mode PiAction added to queue: {message}")
-
-            # manual movement commands
-            elif message['cat'] == "manual":
-                if self.robot_mode.value == 0:  # robot must be in manual mode
-                    if message['value'] == "FC01":
-                        print("\nTask2: Starting Fastest Car")
-                        self.fastest_car()
-                    else:
-                        self.command_queue.put(message['value'])
-                        self.logger.debug(f"Manual Movement added to command queue: {message['value']}")
-                else:
-                    self.android_queue.put(AndroidMessage("error", "Manual movement not allowed in Path mode."))
-                    self.logger.warning("Manual movement not allowed in Path mode.")
-
-            # set obstacles
-            elif message['cat'] == "obstacles":
-                if self.robot_mode.value == 1:  # robot must be in path mode
-                    self.rpi_action_queue.put(PiAction(**message))
-                    self.logger.debug(f"Set obstacles PiAction added to queue: {message}")
-                else:
-                    self.android_queue.put(AndroidMessage("error", "Robot must be in Path mode to set obstacles."))
-                    self.logger.warning("Robot must be in Path mode to set obstacles.")
-
-            # control commands
-            elif message['cat'] == "control":
-                if message['value'] == "start":
-                    # robot must be in path mode
-                    if self.robot_mode.value == 1:
-                        # check api
-                        if not self.check_api():
-                            self.logger.error("API is down! Start command aborted.")
-                            self.android_queue.put(AndroidMessage('error', "API is down, start command aborted."))
-
-                            # buzz STM32 (4 times)
-                            self.stm_link.send("ZZ04")
-
-                        # commencing path following
-                        if not self.command_queue.empty():
-                            self.unpause.set()
-                            self.logger.info("Start command received, starting robot on path!")
-                            self.android_queue.put(AndroidMessage('info', 'Starting robot on path!'))
-                            self.android_queue.put(AndroidMessage('status', 'running'))
-                        else:
-                            self.logger.warning("The command queue is empty, please set obstacles.")
-                            self.android_queue.put(
-                                AndroidMessage("error", "Command queue is empty, did you set obstacles?"))
-                    else:
-                        self.android_queue.put(
-                            AndroidMessage("error", "Robot must be in Path mode to start robot on path."))
-                        self.logger.warning("Robot must be in Path mode to start robot on path.")
-
-            # navigate around obstacle
-            elif message['cat'] == "single-obstacle":
-                if self.robot_mode.value == 1:  # robot must be in path mode
-                    self.rpi_action_queue.put(PiAction(**message))
-                    self.logger.debug(f"Single-obstacle PiAction added to queue: {message}")
-                else:
-                    self.android_queue.put(
-                        AndroidMessage("error", "Robot must be in Path mode to set single obstacle."))
-                    self.logger.warning("Robot must be in Path mode to set single obstacle.")
-
-    def recv_stm(self) -> None:
-        """
-        Receive acknowledgement messages from STM32, and release the movement lock
-        """
-        while True:
-            message: str = self.stm_link.recv()
-
-            # acknowledgement from STM32
-            if message.startswith("ACK"):
-                # release movement lock
-                try:
-                    self.movement_lock.release()
-                    self.logger.debug("ACK from STM32 received, movement lock released.")
-
-                    # if in path mode, get new location and notify android
-                    if self.robot_mode.value == 1:
-                        temp = self.path_queue.get_nowait()
-                        location = {
-                            "x": temp['x'],
-                            "y": temp['y'],
-                            "d": temp['d'],
-                        }
-                        self.android_queue.put(AndroidMessage('location', location))
-                    else:
-                        if message == "ACK|X":
-                            self.logger.debug("Fastest car ACK received from STM32!")
-                            self.android_queue.put(AndroidMessage("info", "Robot has completed fastest car!"))
-                            self.android_queue.put(AndroidMessage("status", "finished"))
-                except Exception:
-                    self.logger.warning("Tried to release a released lock!")
-            else:
-                self.logger.warning(f"Ignored unknown message from STM: {message}")
-
-    def android_sender(self) -> None:
-        """
-        Responsible for retrieving messages from the outgoing message queue and sending them over the Android Link
-        """
-        while True:
-            # retrieve from queue
-            try:
-                message: AndroidMessage = self.android_queue.get(timeout=0.5)
-            except queue.Empty:
-                continue
-
-            # send it over the android link
-            try:
-                self.android_link.send(message)
-            except OSError:
-                self.android_dropped.set()
-                self.logger.debug("Event set: Android dropped")
-
-    def command_follower(self) -> None:
-        while True:
-            # retrieve next movement command
-            command: str = self.command_queue.get()
-
-            # wait for unpause event to be true
-            # self.unpause.wait()
-
-            # acquire lock first (needed for both moving, and snapping pictures)
-            self.movement_lock.acquire()
-
-            # STM32 commands
-            stm32_prefixes = ("FS", "BS", "FW", "BW", "FL", "FR", "BL", "BR", "TL", "TR","IR", "A", "C", "DT", "STOP", "ZZ")
-            if command.startswith(stm32_prefixes):
-                #number =int(command[2:])
-                self.stm_link.send(command)
-                # print("Command sent to STM: ", command)
-
-            elif command.startswith("WN"):
-                # self.stm_link.send(command)
-                self.android_queue.put(AndroidMessage('status', 'running'))
-                self.android_queue.put(AndroidMessage("info", "Starting robot on fastest car!"))
-                
-            # snap command (path mode)
-            elif command.startswith("SNAP"):
-                obstacle_id = command.replace("SNAP", "")
-                self.rpi_action_queue.put(PiAction(cat="snap", value=obstacle_id))
-
-            # snap command (manual mode)
-            elif command.startswith("MANSNAP"):
-                obstacle_id = "99"
-                self.rpi_action_queue.put(PiAction(cat="snap", value=obstacle_id))
-
-            # no-op (a workaround to let the robot stop after a non-bullseye face has been found)
-            elif command.startswith("NOOP"):
-                # self.stm_link.send("FW00")
-                self.movement_lock.release()
-
-            # end of path
-            elif command == "FIN":
-                self.stm_link.send("ZZ01")
-                # clear the unpause event (no new command will be retrieved from queue)
-                self.unpause.clear()
-                self.movement_lock.release()
-                self.logger.info("Commands queue finished.")
-                self.android_queue.put(AndroidMessage("info", "Commands queue finished."))
-                self.android_queue.put(AndroidMessage("status", "finished"))
-                self.rpi_action_queue.put(PiAction(cat="stitch", value=""))
-            else:
-                raise Exception(f"Unknown command: {command}")
-    
-    def set_us_flag(self) -> None:
-        obstacle_count_short = 0
-        obstacle_count_long = 0
-
-        while True:
-            dist = sensors.distance()
-            self.compensate_ydist.value = dist # MAY HAVE TO DELETE THIS!
-            # print("\nTask2: Ultrasonic Distance = ", dist)
-
-            # if (dist <= 50.0):
-            #     obstacle_count_long += 1
-
-            #     if (dist <= 28.0):
-            #         obstacle_count_short += 1
-            #     else:
-            #         obstacle_count_short = 0
-            #         self.ultrasonic_is_clear.value = 1
-            #     if (obstacle_count_short == 2):
-            #         self.ultrasonic_is_clear.value = 0
-            #     if (obstacle_count_long == 2):
-            #         self.ultrasonic_is_clear_samula.value = 0
-            # else:
-            #     obstacle_count_long = 0
-            #     self.ultrasonic_is_clear_samula.value = 1
-
-            # time.sleep(0.1)
-
-
-            if (dist <= 28.0): # Change threshold accordingly
-                obstacle_count_short += 1
-            else:
-                obstacle_count_short = 0
-                self.ultrasonic_is_clear.value = 1
-
-            if obstacle_count_short == 2:
-                self.ultrasonic_is_clear.value = 0
-
-            time.sleep(0.1)
-
-    def move_until_obstacle_us(self): # Not Threaded
-        # Testing Code
-        # while True:
-        #     print("\nself.ultrasonic_is_clear.value: ", self.ultrasonic_is_clear.value)
-        #     time.sleep(0.5)
-
-        if (self.ultrasonic_is_clear.value == 1):
-            print("\nTask2: Moving forward from US, putting FW-- in command queue")
-            self.clear_queues()
-            self.command_queue.put("FW--")
-            start_time = time.time()
-        else:
-            start_time = time.time()
-
-        while True:
-            if (self.ultrasonic_is_clear.value == 0):
-                end_time = time.time()
-                print("\nTask2: Stop from US, putting STOP in command queue")
-                self.clear_queues()
-                self.command_queue.put("STOP")
-                # self.command_queue.put("BW20")
-                # should save distance travelled to total yDist
-                break
-
-            # time.sleep(0.5) # May need to change this value for accuracy
-
-        elapsed_time = end_time - start_time
-        self.total_ytime.value += elapsed_time
-        print("!IMPORTANT: self.total_ytime.value = ", self.total_ytime.value)
-
-    def set_irl_flag(self) -> None:
-
-       while True:
-            # wall = IRtest.readL()
-            wall = sensors.readL()
-            #print("\nTask2: IR Left  = ", wall)
-
-            if (wall): # Change threshold accordingly
-                # print("\nTask2: if (wall) == 1, ir left is clear")
-                # obstacle_count += 1
-                self.ir_left_is_clear.value = 1
-            else:
-                # print("\nTask2: else, ir left wall detected")
-                # obstacle_count = 0
-                self.ir_left_is_clear.value = 0
-
-            # if obstacle_count == 3:
-            #     self.ultrasonic_is_clear.value = 0
-
-            time.sleep(0.1)
-
-    def old_move_past_obstacle_irl(self):
-        print("\nmove_past_obstacle_irl start")
-        if (self.ir_left_is_clear.value == 0): # If not clear, move indefinitely
-            print("\nTask2: Moving forward from IR, putting FW-- in command queue")
-            self.clear_queues()
-            self.command_queue.put("FW--")
-
-        while True:
-            if (self.ir_left_is_clear.value == 1):
-                print("\nTask2: Stop from IR Left, putting STOP in command queue")
-                self.clear_queues()
-                self.command_queue.put("STOP")
-                # self.command_queue.put("FW10")
-                # self.command_queue.put("BW20")
-                # should save distance travelled to total yDist
-                break
-
-            time.sleep(0.5) # May need to change this value for accuracy
-
-    def move_past_obstacle_irl(self):
-        if (self.ir_left_is_clear.value == 0): # If not clear, move FW10
-            print("\nTask2: Moving forward from IR, putting FW10 in command queue")
-            self.clear_queues() # CHECK IF NEED DELETE THIS!!
-            self.command_queue.put("FW10")
-            time.sleep(2) # Just Added
-            self.total_xdist.value += 10
-
-        while True:
-            if (self.ir_left_is_clear.value == 0): # If not clear, move FW10
-                print("\nTask2: Moving forward from IR FROM WHILE TRUE, putting FW10 in command queue")
-                
-                # self.clear_queues() # Just commented this 9:45pm
-                time.sleep(2) # Just added this
-                self.command_queue.put("FW10")
-                self.total_xdist.value += 10
-            else: # If clear obstacle, stop moving and break
-                break
-            
-            print("move_past_obstacle_irl(): Sleeping for 3 seconds")
-            time.sleep(3) # should correspond to how long each fw10 takes, ADJUST!!
-
-        self.command_queue.put("FW10") # CHECK THIS! ADDED TO MAKE SURE CLEAR OBSTACLE 2
-        self.total_xdist.value += 10 # CHECK THIS! ADDED TO MAKE SURE CLEAR OBSTACLE 2
-        
-    def move_past_obstacle_irl_long(self):
-        if (self.ir_left_is_clear.value == 0): # If not clear, move FW10
-            print("\nTask2: Moving forward from IR, putting FW10 in command queue")
-            self.clear_queues() # CHECK IF NEED DELETE THIS!!
-            self.command_queue.put("FW10")
-            self.total_xdist.value += 10
-            time.sleep(2) # Just Added
-
-        while True:
-            if (self.ir_left_is_clear.value == 0): # If not clear, move FW10
-                print("\nTask2: Moving forward from IR FROM WHILE TRUE, putting FW10 in command queue")
-                
-                # self.clear_queues() # Just commented this 9:45pm
-                time.sleep(2) # Just added this
-                self.command_queue.put("FW10")
-                self.total_xdist.value += 10
-            else: # If clear obstacle, stop moving and break
-                break
-            
-            print("move_past_obstacle_irl(): Sleeping for 3 seconds")
-            time.sleep(3) # should correspond to how long each fw10 takes, ADJUST!!
-
-        # self.command_queue.put("FW10") # CHECK THIS! ADDED TO MAKE SURE CLEAR OBSTACLE 2
-        # self.total_xdist.value += 10 # CHECK THIS! ADDED TO MAKE SURE CLEAR OBSTACLE 2
-
-    def set_irr_flag(self) -> None:
-        
-        while True:
-        # wall = IRtest.readL()
-            wall = sensors.readR()
-            #print("\nTask2: IR Left  = ", wall)
-
-            if (wall): # Change threshold accordingly
-                # print("\nTask2: if (wall) == 1, ir right is clear")
-                # obstacle_count += 1
-                self.ir_right_is_clear.value = 1
-            else:
-                # print("\nTask2: else, ir right wall detected")
-                # obstacle_count = 0
-                self.ir_right_is_clear.value = 0
-
-            # if obstacle_count == 3:
-            #     self.ultrasonic_is_clear.value = 0
-
-            time.sleep(0.1)
-    
-    def move_past_obstacle_irr(self):
-        if (self.ir_right_is_clear.value == 0): # If not clear, move FW10
-            print("\nTask2: Moving forward from IR, putting FW10 in command queue")
-            self.clear_queues() # CHECK IF NEED DELETE THIS!!
-            self.command_queue.put("FW10")
-            time.sleep(2) # Just Added
-            self.total_xdist.value += 10
-
-        while True:
-            if (self.ir_right_is_clear.value == 0): # If not clear, move FW10
-                print("\nTask2: Moving forward from IR, putting FW10 in command queue")
-                
-                # self.clear_queues() # Just commented this 9:45pm
-                time.sleep(2) # Just added this
-                self.command_queue.put("FW10")
-                self.total_xdist.value += 10
-            else: # If clear obstacle, stop moving and break
-                break
-            
-            print("move_past_obstacle_irr(): sleeping for 3 seconds")
-            time.sleep(3) # should correspond to how long each fw10 takes, ADJUST!!
-
-        self.command_queue.put("FW10") # CHECK THIS! ADDED TO MAKE SURE CLEAR OBSTACLE 2
-        self.total_xdist.value += 10 # CHECK THIS! ADDED TO MAKE SURE CLEAR OBSTACLE 2
-
-    def move_past_obstacle_irr_long(self):
-        if (self.ir_right_is_clear.value == 0): # If not clear, move FW10
-            print("\nTask2: Moving forward from IR, putting FW10 in command queue")
-            self.clear_queues() # CHECK IF NEED DELETE THIS!!
-            self.command_queue.put("FW10")
-            self.total_xdist.value += 10
-            time.sleep(2) # Just Added
-
-        while True:
-            if (self.ir_right_is_clear.value == 0): # If not clear, move FW10
-                print("\nTask2: Moving forward from IR, putting FW10 in command queue")
-                
-                # self.clear_queues() # Just commented this 9:45pm
-                time.sleep(2) # Just added this
-                self.command_queue.put("FW10")
-                self.total_xdist.value += 10
-            else: # If clear obstacle, stop moving and break
-                break
-            
-            print("move_past_obstacle_irr(): sleeping for 3 seconds")
-            time.sleep(3) # should correspond to how long each fw10 takes, ADJUST!!
-
-        # self.command_queue.put("FW10") # CHECK THIS! ADDED TO MAKE SURE CLEAR OBSTACLE 2
-        # self.total_xdist.value += 10 # CHECK THIS! ADDED TO MAKE SURE CLEAR OBSTACLE 2   
-
-    def clear_first_obstacle(self, first_arrow_dir: str):
-        if first_arrow_dir == "38": # Right Arrow
-            hardcoded_path: List[str] = [
-                "FR30", "FL30", "FL30", "FR30"
-            ]
-            self.clear_queues()
-            for c in hardcoded_path:
-                self.command_queue.put(c)
-
-        elif first_arrow_dir == "39": # Left Arrow
-            hardcoded_path: List[str] = [
-                "FL30", "FR30", "FR30", "FL30"
-            ]
-            self.clear_queues()
-            for c in hardcoded_path:
-                self.command_queue.put(c)
-
-        else:
-            hardcoded_path: List[str] = [
-                "FR30", "FL30", "FL30", "FR30"
-            ]
-            self.clear_queues()
-            for c in hardcoded_path:
-                self.command_queue.put(c)
-
-    def clear_second_obstacle_p1(self, second_arrow_dir: str):
-        print("clear_first_obstacle(): sleeping for 5 seconds")
-        time.sleep(5)
-        print("\nTask2: clear_second_obstacle_p1")
-
-        if second_arrow_dir == "38": # Right Arrow
-            print("\n\n\ncompensate_ydist:", self.compensate_ydist.value)
-            if (self.compensate_ydist.value < 15.0):
-                dist_to_move = int(27 - int(self.compensate_ydist.value))
-                if dist_to_move >= 0:
-                    # self.command_queue.put(f"BW{dist_to_move:02d}")
-                    self.command_queue.put("BW05")
-                    time.sleep(2)
-            
-            print("\nTask2: clear_second_obstacle_p1 -> Hardcoded FR30 to command_queue")
-            hardcoded_path: List[str] = ["FR30"]
-            self.clear_queues()
-            for c in hardcoded_path:
-                self.command_queue.put(c)
-            print("clear_second_obstacle_p1() -> first right turn: sleeping for 10 seconds")
-            time.sleep(10)
-
-            print("\nTask2: clear_second_obstacle_p1 -> move_past_obstacle_irl")
-            # self.old_move_past_obstacle_irl()
-            self.move_past_obstacle_irl()
-            print("\nIMPORTANT! total xdist = ", self.total_xdist.value)
-
-            print("clear_second_obstacle_p1() -> after move_past_obstacle_irl : sleeping for 5 seconds")
-            time.sleep(5)
-
-            # Along width of Obstacle 2
-            print("\nTask2: clear_second_obstacle_p1 -> Hardcoded FL30 to command_queue")
-            hardcoded_path: List[str] = ["FL30", "FW10"]
-            # self.clear_queues()
-            for c in hardcoded_path:
-                self.command_queue.put(c)
-
-            # print("\nSee if this moves forward before turning left to xaxis travel")
-            # hardcoded_path: List[str] = ["FW20"]
-            # # self.clear_queues()
-            # for c in hardcoded_path:
-            #     self.command_queue.put(c)
-
-        elif second_arrow_dir == "39": # Left Arrow
-            print("\n\n\ncompensate_ydist:", self.compensate_ydist.value)
-            if (self.compensate_ydist.value < 15.0):
-                dist_to_move = int(27 - int(self.compensate_ydist.value))
-                if dist_to_move >= 0:
-                    # self.command_queue.put(f"BW{dist_to_move:02d}")
-                    self.command_queue.put("BW05")
-                    time.sleep(2)
-            
-            print("\nTask2: clear_second_obstacle_p1 -> Hardcoded FL30 to command_queue")
-            hardcoded_path: List[str] = ["FL30"]
-            self.clear_queues()
-            for c in hardcoded_path:
-                self.command_queue.put(c)
-
-            print("clear_second_obstacle_p1() -> first left turn: sleeping for 10 seconds")
-            time.sleep(10)
-
-            print("\nTask2: clear_second_obstacle_p1 -> move_past_obstacle_irr")
-            # self.old_move_past_obstacle_irr()
-            self.move_past_obstacle_irr()
-            print("\nIMPORTANT! total xdist = ", self.total_xdist.value)
-            print("clear_second_obstacle_p1() -> after move_past_obstacle_irr : sleeping for 5 seconds")
-            time.sleep(5)
-
-            # Along width of Obstacle 2
-            print("\nTask2: clear_second_obstacle_p1 -> Hardcoded FR30 to command_queue")
-            hardcoded_path: List[str] = ["FR30", "FW10"]
-            # self.clear_queues()
-            for c in hardcoded_path:
-                self.command_queue.put(c)
-
-            # print("\nSee if this moves forward before turning left to xaxis travel")
-            # hardcoded_path: List[str] = ["FW20"]
-            # # self.clear_queues()
-            # for c in hardcoded_path:
-            #     self.command_queue.put(c)
-
-        else:
-            print("\n\n\ncompensate_ydist:", self.compensate_ydist.value)
-            if (self.compensate_ydist.value < 15.0):
-                dist_to_move = int(27 - int(self.compensate_ydist.value))
-                if dist_to_move >= 0:
-                    # self.command_queue.put(f"BW{dist_to_move:02d}")
-                    self.command_queue.put("BW05")
-                    time.sleep(2)
-            
-            print("\nTask2: clear_second_obstacle_p1 -> Hardcoded FR30 to command_queue")
-            hardcoded_path: List[str] = ["FR30"]
-            self.clear_queues()
-            for c in hardcoded_path:
-                self.command_queue.put(c)
-
-            print("clear_second_obstacle_p1() -> first right turn: sleeping for 10 seconds")
-            time.sleep(10)
-
-            print("\nTask2: clear_second_obstacle_p1 -> move_past_obstacle_irl")
-            # self.old_move_past_obstacle_irl()
-            self.move_past_obstacle_irl()
-            print("clear_second_obstacle_p1() -> after move_past_obstacle_irl : sleeping for 5 seconds")
-            time.sleep(5)
-
-            # Along width of Obstacle 2
-            print("\nTask2: clear_second_obstacle_p1 -> Hardcoded FL30 to command_queue")
-            hardcoded_path: List[str] = ["FL30", "FW10"]
-            # self.clear_queues()
-            for c in hardcoded_path:
-                self.command_queue.put(c)
-
-            # print("\nSee if this moves forward before turning left to xaxis travel")
-            # hardcoded_path: List[str] = ["FW20"]
-            # # self.clear_queues()
-            # for c in hardcoded_path:
-            #     self.command_queue.put(c)
-
-    def clear_second_obstacle_p2(self, second_arrow_dir: str):
-        print("clear_second_obstacle_p2(): sleeping for 5 seconds")
-        time.sleep(5)
-        print("\nTask2: clear_second_obstacle_p2")
-
-        if second_arrow_dir == "38": # Right Arrow
-            # Along X Axis
-            print("\nTask2: clear_second_obstacle_p2 -> Hardcoded FL30 to command_queue, turn to xaxis ")
-            hardcoded_path: List[str] = ["FL30"]
-            # self.clear_queues()
-            for c in hardcoded_path:
-                self.command_queue.put(c)
-
-            doubled_xdist = ((self.total_xdist.value) * 2) + 30
-            if (self.total_xdist.value <= 20):
-                doubled_xdist += 20
-            print("\n!IMPORTANT: MOVING FORWARD BY ", doubled_xdist)
-
-            if (doubled_xdist <= 99):
-                print("\nFW", doubled_xdist)
-                self.command_queue.put(f"FW{doubled_xdist:02d}")
-            else: # If exceeds 99
-                print("\nFW99")
-                self.command_queue.put("FW99")
-                remaining_xdist = doubled_xdist - 99
-
-                if (remaining_xdist < 99):
-                    print("\nFW", remaining_xdist)
-                    self.command_queue.put(f"FW{remaining_xdist:02d}")
-                else: # Stil longer than 99
-                    print("\nFW99")
-                    self.command_queue.put("FW99")
-                    remaining_xdist = remaining_xdist - 99
-                    print("\nFW", remaining_xdist)
-                    self.command_queue.put(f"FW{remaining_xdist:02d}")
-            print("clear_second_obstacle_p2() -> after clearing x-axis: sleeping for 5 seconds")
-            time.sleep(5)
-                
-            # print("\n!IMPORTANT: MOVING FORWARD BY ", self.total_xdist.value)
-
-            # if (self.total_xdist.value <= 99):
-            #     print("\nFW", self.total_xdist.value)
-            #     self.command_queue.put(f"FW{self.total_xdist.value:02d}")
-            # else: # If exceeds 99
-            #     print("\nFW99")
-            #     self.command_queue.put("FW99")
-            #     remaining_xdist = self.total_xdist.value - 99
-
-            #     if (remaining_xdist < 99):
-            #         print("\nFW", remaining_xdist)
-            #         self.command_queue.put(f"FW{remaining_xdist:02d}")
-            #     else: # Stil longer than 99
-            #         print("\nFW99")
-            #         self.command_queue.put("FW99")
-            #         remaining_xdist = remaining_xdist - 99
-            #         print("\nFW", remaining_xdist)
-            #         self.command_queue.put(f"FW{remaining_xdist:02d}")
-            # print("clear_second_obstacle_p2() -> after clearing x-axis: sleeping for 5 seconds")
-            # time.sleep(5)
-            
-            self.move_past_obstacle_irl_long()
-
-        elif second_arrow_dir == "39": # Left Arrow
-            # Along X Axis
-            print("\nTask2: clear_second_obstacle_p2 -> Hardcoded FR30 to command_queue, turn to xaxis ")
-            hardcoded_path: List[str] = ["FR30"]
-            # self.clear_queues()
-            for c in hardcoded_path:
-                self.command_queue.put(c)
-
-            doubled_xdist = ((self.total_xdist.value) * 2) + 30
-            if (self.total_xdist.value <= 20):
-                doubled_xdist += 20
-            print("\n!IMPORTANT: MOVING FORWARD BY ", doubled_xdist)
-
-            if (doubled_xdist <= 99):
-                print("\nFW", doubled_xdist)
-                self.command_queue.put(f"FW{doubled_xdist:02d}")
-            else: # If exceeds 99
-                print("\nFW99")
-                self.command_queue.put("FW99")
-                remaining_xdist = doubled_xdist - 99
-
-                if (remaining_xdist < 99):
-                    print("\nFW", remaining_xdist)
-                    self.command_queue.put(f"FW{remaining_xdist:02d}")
-                else: # Stil longer than 99
-                    print("\nFW99")
-                    self.command_queue.put("FW99")
-                    remaining_xdist = remaining_xdist - 99
-                    print("\nFW", remaining_xdist)
-                    self.command_queue.put(f"FW{remaining_xdist:02d}")
-            print("clear_second_obstacle_p2() -> after clearing x-axis: sleeping for 5 seconds")
-            time.sleep(5)
-            
-            # print("\n!IMPORTANT: MOVING FORWARD BY ", self.total_xdist.value)
-
-            # if (self.total_xdist.value <= 99):
-            #     print("\nFW", self.total_xdist.value)
-            #     self.command_queue.put(f"FW{self.total_xdist.value:02d}")
-            # else: # If exceeds 99
-            #     print("\nFW99")
-            #     self.command_queue.put("FW99")
-            #     remaining_xdist = self.total_xdist.value - 99
-
-            #     if (remaining_xdist < 99):
-            #         print("\nFW", remaining_xdist)
-            #         self.command_queue.put(f"FW{remaining_xdist:02d}")
-            #     else: # Stil longer than 99
-            #         print("\nFW99")
-            #         self.command_queue.put("FW99")
-            #         remaining_xdist = remaining_xdist - 99
-            #         print("\nFW", remaining_xdist)
-            #         self.command_queue.put(f"FW{remaining_xdist:02d}")
-            # print("clear_second_obstacle_p2() -> after clearing x-axis: sleeping for 5 seconds")
-            # time.sleep(5)
-
-            self.move_past_obstacle_irr_long()
-
-        else:
-            # Along X Axis
-            print("\nTask2: clear_second_obstacle_p2 -> Hardcoded FL30 to command_queue, turn to xaxis ")
-            hardcoded_path: List[str] = ["FL30"]
-            # self.clear_queues()
-            for c in hardcoded_path:
-                self.command_queue.put(c)
-
-            doubled_xdist = ((self.total_xdist.value) * 2) + 30
-            if (self.total_xdist.value <= 20):
-                doubled_xdist += 20
-            print("\n!IMPORTANT: MOVING FORWARD BY ", doubled_xdist)
-
-            if (doubled_xdist <= 99):
-                print("\nFW", doubled_xdist)
-                self.command_queue.put(f"FW{doubled_xdist:02d}")
-            else: # If exceeds 99
-                print("\nFW99")
-                self.command_queue.put("FW99")
-                remaining_xdist = doubled_xdist - 99
-
-                if (remaining_xdist < 99):
-                    print("\nFW", remaining_xdist)
-                    self.command_queue.put(f"FW{remaining_xdist:02d}")
-                else: # Stil longer than 99
-                    print("\nFW99")
-                    self.command_queue.put("FW99")
-                    remaining_xdist = remaining_xdist - 99
-                    print("\nFW", remaining_xdist)
-                    self.command_queue.put(f"FW{remaining_xdist:02d}")
-            print("clear_second_obstacle_p2() -> after clearing x-axis: sleeping for 5 seconds")
-            time.sleep(5)
-                
-            # print("\n!IMPORTANT: MOVING FORWARD BY ", self.total_xdist.value)
-
-            # if (self.total_xdist.value <= 99):
-            #     print("\nFW", self.total_xdist.value)
-            #     self.command_queue.put(f"FW{self.total_xdist.value:02d}")
-            # else: # If exceeds 99
-            #     print("\nFW99")
-            #     self.command_queue.put("FW99")
-            #     remaining_xdist = self.total_xdist.value - 99
-
-            #     if (remaining_xdist < 99):
-            #         print("\nFW", remaining_xdist)
-            #         self.command_queue.put(f"FW{remaining_xdist:02d}")
-            #     else: # Stil longer than 99
-            #         print("\nFW99")
-            #         self.command_queue.put("FW99")
-            #         remaining_xdist = remaining_xdist - 99
-            #         print("\nFW", remaining_xdist)
-            #         self.command_queue.put(f"FW{remaining_xdist:02d}")
-            # print("clear_second_obstacle_p2() -> after clearing x-axis: sleeping for 5 seconds")
-            # time.sleep(5)
-            
-            self.move_past_obstacle_irl_long()
-    
-    def clear_second_obstacle_p3(self, second_arrow_dir: str):
-        print("clear_second_obstacle_p3() -> before start: sleeping for 5 seconds")
-        time.sleep(5)
-        print("\nTask2: clear_second_obstacle_p3")
-
-        if second_arrow_dir == "38": # Right Arrow
-            # To Face Back Home
-            print("\nTask2: clear_second_obstacle_p3 -> Hardcoded FL30 to command_queue")
-            hardcoded_path: List[str] = ["FL30"]
-            # self.clear_queues()
-            for c in hardcoded_path:
-                self.command_queue.put(c)
-
-        elif second_arrow_dir == "39": # Left Arrow
-            # To Face Back Home
-            print("\nTask2: clear_second_obstacle_p3 -> Hardcoded FR30 to command_queue")
-            hardcoded_path: List[str] = ["FR30"]
-            # self.clear_queues()
-            for c in hardcoded_path:
-                self.command_queue.put(c)
-
-        else:
-            # To Face Back Home
-            print("\nTask2: clear_second_obstacle_p3 -> Hardcoded FL30 to command_queue")
-            hardcoded_path: List[str] = ["FL30"]
-            # self.clear_queues()
-            for c in hardcoded_path:
-                self.command_queue.put(c)
-
-    def return_home(self):
-        print("\nTask2: return_home() pang kang lo")
-
-        # self.command_queue.put("FW10")
-        # time.sleep(1)
-        # self.total_ytime.value = self.total_ytime.value - 0.3
-        # print("!IMPORTANT: total_ytime.value MOVING FORWARD FOR ", self.total_ytime.value)
-
-        # if (self.total_xdist.value <= 20):
-        #     self.total_xdist.value = self.total_xdist.value + 10
-
-        # self.command_queue.put("FW--")
-        # print("return home() -> going straight: sleeping for ", self.total_ytime.value," seconds")
-        # time.sleep(self.total_ytime.value)
-        # self.command_queue.put("STOP")
-
-        # Final Turns to Go Home
-        time.sleep(3)
-        local_ydist = 0
-        local_ydist = self.between_obstacles_ydist.value
-        print("!YOYO: PUTTING FW", local_ydist)
-        # self.command_queue.put(f"FW{local_ydist:02d}")
-        
-        if (local_ydist <= 99):
-            print("\nFW", local_ydist)
-            self.command_queue.put(f"FW{local_ydist:02d}")
-        else: # If exceeds 99
-            print("\nFW99")
-            self.command_queue.put("FW99")
-            remaining_xdist = local_ydist - 99
-
-            if (remaining_xdist < 99):
-                print("\nFW", remaining_xdist)
-                self.command_queue.put(f"FW{remaining_xdist:02d}")
-            else: # Stil longer than 99
-                print("\nFW99")
-                self.command_queue.put("FW99")
-                remaining_xdist = remaining_xdist - 99
-                print("\nFW", remaining_xdist)
-                self.command_queue.put(f"FW{remaining_xdist:02d}")
-
-        time.sleep(5)
-
-        if second_arrow_dir == "38": # Right Arrow:
-            hardcoded_path: List[str] = ["FL30"]
-            self.clear_queues()
-            for c in hardcoded_path:
-                self.command_queue.put(c)
-
-            time.sleep(5)
-            print("ultrasonic_is_clear_samula.value is ", self.ultrasonic_is_clear_samula.value)
-            # check for obstacle using US
-            if (self.ultrasonic_is_clear_samula.value == 0):
-                print("\nreturn home() -> samula code: sleeping for ", 3," seconds")
-                time.sleep(3)
-
-                # if there is an obstacle, BL30
-                hardcoded_path: List[str] = ["BL30", "FW30", "FL30"]
-                for c in hardcoded_path:
-                    self.command_queue.put(c)
-                print("return home() -> samula code: sleeping for ", 3," seconds")
-                time.sleep(10)
-            else:
-                print("\n#CHECK! SAMULA DID NOT HAPPEN")
-
-            single_xdist = int((self.total_xdist.value * 2) / 4)
-            single_xdist += 20
-            print("\n!IMPORTANT: MOVING FORWARD BY ", single_xdist)
-            if (single_xdist <= 99):
-                print("\nFW", single_xdist)
-                self.command_queue.put(f"FW{single_xdist:02d}")
-            else: # If exceeds 99
-                print("\nFW99")
-                self.command_queue.put("FW99")
-                remaining_xdist = single_xdist - 99
-
-                if (remaining_xdist < 99):
-                    print("\nFW", remaining_xdist)
-                    self.command_queue.put(f"FW{remaining_xdist:02d}")
-                else: # Stil longer than 99
-                    print("\nFW99")
-                    self.command_queue.put("FW99")
-                    remaining_xdist = remaining_xdist - 99
-                    print("\nFW", remaining_xdist)
-                    self.command_queue.put(f"FW{remaining_xdist:02d}")
-
-
-            time.sleep(3)
-            self.command_queue.put("FR30")
-            print("return home() -> after facing carpark : sleeping for 10 seconds")
-            time.sleep(10)
-
-            # print("\nTask2: calling self.move_until_obstacle_us()")
-            # self.move_until_obstacle_us()
-            
-        elif second_arrow_dir == "39": # Left Arrow
-            hardcoded_path: List[str] = ["FR30"]
-            self.clear_queues()
-            for c in hardcoded_path:
-                self.command_queue.put(c)
-            
-            time.sleep(5)
-            print("ultrasonic_is_clear_samula.value is ", self.ultrasonic_is_clear_samula.value)
-            # check for obstacle using US
-            if (self.ultrasonic_is_clear_samula.value == 0):
-                print("\nreturn home() -> samula code: sleeping for ", 3," seconds")
-                time.sleep(3)
-
-                # if there is an obstacle, BL30
-                hardcoded_path: List[str] = ["BR30", "FW30", "FR30"]
-                for c in hardcoded_path:
-                    self.command_queue.put(c)
-                print("return home() -> samula code: sleeping for ", 3," seconds")
-                time.sleep(10)
-            else:
-                print("\n#CHECK! SAMULA DID NOT HAPPEN")
-
-            single_xdist = int((self.total_xdist.value * 2) / 4)
-            single_xdist += 20
-            print("\n!IMPORTANT: MOVING FORWARD BY ", single_xdist)
-            if (single_xdist <= 99):
-                print("\nFW", single_xdist)
-                self.command_queue.put(f"FW{single_xdist:02d}")
-            else: # If exceeds 99
-                print("\nFW99")
-                self.command_queue.put("FW99")
-                remaining_xdist = single_xdist - 99
-
-                if (remaining_xdist < 99):
-                    print("\nFW", remaining_xdist)
-                    self.command_queue.put(f"FW{remaining_xdist:02d}")
-                else: # Stil longer than 99
-                    print("\nFW99")
-                    self.command_queue.put("FW99")
-                    remaining_xdist = remaining_xdist - 99
-                    print("\nFW", remaining_xdist)
-                    self.command_queue.put(f"FW{remaining_xdist:02d}")
-
-            time.sleep(3)
-            self.command_queue.put("FL30")
-            print("return home() -> after facing carpark : sleeping for 10 seconds")
-            time.sleep(10)
-
-        else:
-            hardcoded_path: List[str] = ["FL30"]
-            self.clear_queues()
-            for c in hardcoded_path:
-                self.command_queue.put(c)
-
-            time.sleep(5)
-            print("ultrasonic_is_clear_samula.value is ", self.ultrasonic_is_clear_samula.value)
-            # check for obstacle using US
-            if (self.ultrasonic_is_clear_samula.value == 0):
-                print("\nreturn home() -> samula code: sleeping for ", 3," seconds")
-                time.sleep(3)
-
-                # if there is an obstacle, BL30
-                hardcoded_path: List[str] = ["BL30", "FW30", "FL30"]
-                for c in hardcoded_path:
-                    self.command_queue.put(c)
-                print("return home() -> samula code: sleeping for ", 3," seconds")
-                time.sleep(10)
-            else:
-                print("\n#CHECK! SAMULA DID NOT HAPPEN")
-
-            single_xdist = int((self.total_xdist.value * 2) / 4)
-            single_xdist += 20
-            print("\n!IMPORTANT: MOVING FORWARD BY ", single_xdist)
-            if (single_xdist <= 99):
-                print("\nFW", single_xdist)
-                self.command_queue.put(f"FW{single_xdist:02d}")
-            else: # If exceeds 99
-                print("\nFW99")
-                self.command_queue.put("FW99")
-                remaining_xdist = single_xdist - 99
-
-                if (remaining_xdist < 99):
-                    print("\nFW", remaining_xdist)
-                    self.command_queue.put(f"FW{remaining_xdist:02d}")
-                else: # Stil longer than 99
-                    print("\nFW99")
-                    self.command_queue.put("FW99")
-                    remaining_xdist = remaining_xdist - 99
-                    print("\nFW", remaining_xdist)
-                    self.command_queue.put(f"FW{remaining_xdist:02d}")
-
-
-            time.sleep(3)
-            self.command_queue.put("FR30")
-            print("return home() -> after facing carpark : sleeping for 10 seconds")
-            time.sleep(10)
-
-            # print("\nTask2: calling self.move_until_obstacle_us()")
-            # self.move_until_obstacle_us()
-
-    def return_home_2(self):
-        print("\nTask2: return_home_2() pang kang lo")
-
-        if (self.ultrasonic_is_clear.value == 1):
-            print("\nTask2: FINAL Moving forward from US, putting FW-- in command queue")
-            self.command_queue.put("FW--")
-
-        while True:
-            if (self.ultrasonic_is_clear.value == 0):
-                print("\nTask2: FINAL Stop from US, putting STOP in command queue")
-                self.clear_queues()
-                self.command_queue.put("STOP")
-                break
-
-
-    def detect_arrow_image(self):
-        obstacle_id = "_1_obstacle"
-        arrow_direction = self.snap_and_rec_2(obstacle_id)
-        return arrow_direction
-
-    def snap_and_rec_2(self, obstacle_id: str) -> None:
-        # capture an image
-        stream = io.BytesIO()
-        with picamera.PiCamera() as camera:
-            camera.start_preview()
-            time.sleep(1)
-            camera.capture(stream, format='jpeg')
-
-        self.logger.info("Image captured. Calling image-rec api...")
-        # release lock so that bot can continue moving
-        # self.movement_lock.release()
-
-        # call image-rec API endpoint
-        self.logger.debug("Requesting from image API")
-        url = f"http://{API_IMAGE_IP}:{API_IMAGE_PORT}/image"
-        filename = f"{int(time.time())}_{obstacle_id}.jpg"
-        image_data = stream.getvalue()
-        response = requests.post(url, files={"file": (filename, image_data)})
-
-        if response.status_code != 200:
-            self.logger.error("Something went wrong when requesting path from image-rec API. Please try again.")
-            self.android_queue.put(AndroidMessage(
-                "error", "Something went wrong when requesting path from image-rec API. Please try again."))
-            return
-
-        results = json.loads(response.content)
-        # self.android_queue.put(AndroidMessage("image-rec", results))
-        # return results
-
-        # response_data = response.json()
-        image_id = results['image_id']
-        global arrow_dir
-        arrow_dir = image_id
-        return arrow_dir
-
-    def fastest_car(self):
-        global first_arrow_dir
-        global second_arrow_dir
-
-        xdist = 0 # left/right
-        ydist = 0 # forward/backward
-
-        # Obstacle 1 code
-        print("\nTask2: calling self.move_until_obstacle_us()")
-        self.move_until_obstacle_us()
-
-        print("fastest_car() : sleeping for 1 seconds")
-        time.sleep(1)
-
-        print("\nTask2: calling self.detect_arrow_image()")
-        first_arrow_dir = self.detect_arrow_image()
-        print("\nTask2: first_arrow_dir = ", first_arrow_dir)
-
-        print("\nTask2: calling clear_first_obstacle()")
-        self.clear_first_obstacle(first_arrow_dir)
-
-        print("fastest_car() -> after clear_first_obstacle() : sleeping for 10 seconds")
-        time.sleep(10) # CHECK THIS!!!
-
-        # OBSTACLE 2 CODE ONWARDS
-        # self.between_obstacles_ydist.value = self.compensate_ydist.value
-
-        time.sleep(3)
-        # special_ydist = 0
-        max_list = []
-        for i in range(5):
-            if int(self.compensate_ydist.value) < 150:
-                max_list.append(int(self.compensate_ydist.value))
-            time.sleep(0.5)
-        if max(max_list) is not None:
-            self.between_obstacles_ydist.value = max(max_list)
-        else:
-            self.between_obstacles_ydist.value = 100
-        self.between_obstacles_ydist.value += 70
-
-        print("\nTask2: calling self.move_until_obstacle_us()")
-        self.move_until_obstacle_us()
-        
-        print("\nTask2: calling self.detect_arrow_image()")
-        second_arrow_dir = self.detect_arrow_image()
-        print("\nTask2: second_arrow_dir = ", second_arrow_dir)
-
-        print("\nTask2: calling clear_second_obstacle_p1()")
-        self.clear_second_obstacle_p1(second_arrow_dir)
-
-        print("\nTask2: calling clear_second_obstacle_p2()")
-        self.clear_second_obstacle_p2(second_arrow_dir)
-
-        print("\nTask2: calling clear_second_obstacle_p3()")
-        self.clear_second_obstacle_p3(second_arrow_dir)
-
-        print("fastest_car() -> after clear_second_obstacle_p3() : sleeping for 5 seconds")
-        time.sleep(5)
-
-        print("\nTask2: calling return_home()")
-        self.return_home()
-
-        time.sleep(4)
-        self.return_home_2()
-
-        time.sleep(1)
-        self.stm_link.send("ZZ02")
-        
-
-    
-    def wait_for_acknowledgment(self) -> bool:
-        """
-        Waits for acknowledgment (ACK) from STM32 after sending a command.
-        Returns True if acknowledgment received within a timeout, otherwise False.
-        """
-        timeout = 10  # Adjust the timeout value as needed
-        start_time = time.time()
-        
-        while time.time() - start_time < timeout:
-                return True
-        
-        return False
-
-    def rpi_action(self):
-        while True:
-            action: PiAction = self.rpi_action_queue.get()
-            self.logger.debug(f"PiAction retrieved from queue: {action.cat} {action.value}")
-
-            if action.cat == "mode":
-                self.change_mode(action.value)
-            elif action.cat == "single-obstacle":
-                self.add_navigate_path()
-            elif action.cat == "stitch":
-                self.request_stitch()
-
-    def change_mode(self, new_mode):
-        # if robot already in correct mode
-        if new_mode == "manual" and self.robot_mode.value == 0:
-            self.android_queue.put(AndroidMessage('error', 'Robot already in Manual mode.'))
-            self.logger.warning("Robot already in Manual mode.")
-        elif new_mode == "path" and self.robot_mode.value == 1:
-            self.android_queue.put(AndroidMessage('error', 'Robot already in Path mode.'))
-            self.logger.warning("Robot already in Path mode.")
-        else:
-            # change robot mode
-            self.robot_mode.value = 0 if new_mode == 'manual' else 1
-
-            # clear command, path queues
-            self.clear_queues()
-
-            # set unpause event, so that robot can freely move
-            if new_mode == "manual":
-                self.unpause.set()
-            else:
-                self.unpause.clear()
-
-            # release movement lock, if it was previously acquired
-            try:
-                self.movement_lock.release()
-            except Exception:
-                self.logger.warning("Tried to release a released lock!")
-
-            # notify android
-            self.android_queue.put(AndroidMessage('info', f'Robot is now in {new_mode.title()} mode.'))
-            self.logger.info(f"Robot is now in {new_mode.title()} mode.")
-
-            # buzz stm32 (1 time)
-            self.stm_link.send("ZZ01")
-
-    def clear_queues(self):
-        while not self.command_queue.empty():
-            self.command_queue.get()
-        while not self.path_queue.empty():
-            self.path_queue.get()
-
-    def check_api(self) -> bool:
-        url = f"http://{API_IP}:{API_PORT}/status"
-        try:
-            response = requests.get(url, timeout=1)
-            if response.status_code == 200:
-                self.logger.debug("API is up!")
-                return True
-        except ConnectionError:
-            self.logger.warning("API Connection Error")
-            return False
-        except requests.Timeout:
-            self.logger.warning("API Timeout")
-            return False
-        except Exception as e:
-            self.logger.warning(f"API Exception: {e}")
-            return False
-
-    def request_stitch(self):
-        url = f"http://{API_IMAGE_IP}:{API_IMAGE_PORT}/stitch"
-        response = requests.get(url)
-
-        # error encountered at the server, return early
-        if response.status_code != 200:
-            # notify android
-            self.android_queue.put(AndroidMessage("error", "Something went wrong when requesting stitch from the API."))
-            self.logger.error("Something went wrong when requesting stitch from the API.")
-            return
-
-        self.logger.info("Images stitched!")
-        self.android_queue.put(AndroidMessage("info", "Images stitched!"))
-
-    def add_navigate_path(self):
-        # our hardcoded path
-        hardcoded_path: List[str] = [
-            "DT20", "SNAPS", "NOOP",
-            "FR00", "FL00", "FW30", "BR00", "FW10", "SNAPE", "NOOP",
-            "FR00", "FL00", "FW30", "BR00", "FW10", "SNAPN", "NOOP",
-            "FR00", "FL00", "FW30", "BR00", "FW10", "SNAPW", "NOOP",
-            "FIN"
-        ]
-
-        # put commands and paths into queues
-        self.clear_queues()
-        for c in hardcoded_path:
-            self.command_queue.put(c)
-            self.path_queue.put({
-                "d": 0,
-                "s": -1,
-                "x": 1,
-                "y": 1
-            })
-
-        self.logger.info("Navigate-around-obstacle path loaded. Robot is ready to move.")
-        self.android_queue.put(AndroidMessage("info", "Navigate-around-obstacle path loaded. Robot is ready to move."))
-
-    @staticmethod
-    def outdoorsify(original):
-        # for turns, only replace regular 3-1 turns (TL00), with outdoor-calibrated 3-1 turns (TL20)
-        # large turns (TL30) do not need to be changed, as they are already calibrated for outdoors
-        if original in ["FL00", "FR00", "BL00", "BR00"]:
-            return original[:2] + "20"
-        elif original.startswith("FW"):
-            return original.replace("FW", "FS")
-        elif original.startswith("BW"):
-            return original.replace("BW", "BS")
-        else:
-            return original
-
-
-if __name__ == "__main__":
-    rpi = RaspberryPi()
-    rpi.start()
+#!/usr/bin/env python3
+
+import ctypes
+import io
+import json
+import logging
+import os
+import queue
+import sys
+import time
+from multiprocessing import get_context, Manager, Queue, RawValue, Lock, Event
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from enum import IntEnum
+from functools import lru_cache
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+import sensors
+from command_ring import CommandRing, MAX_COMMAND_LENGTH
+
+import picamera
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    # C parser, several times faster than the stdlib one on the Android messages
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+from communication.android import AndroidLink, AndroidMessage
+from communication.stm32 import STMLink
+from consts import SYMBOL_MAP
+from logger import prepare_logger
+from settings import API_IP, API_PORT, OUTDOOR_BIG_TURN, API_IMAGE_IP, API_IMAGE_PORT
+
+# commands forwarded to the STM32 by command_follower, most are matched on their 2-char prefix with one set lookup
+STM32_PREFIXES = frozenset({"FS", "BS", "FW", "BW", "FL", "FR", "BL", "BR", "TL", "TR", "IR", "DT", "ZZ"})
+STM32_PREFIXES_OTHER = ("A", "C", "STOP")
+# commands command_follower handles on the Pi itself, plus the exact "FIN"
+PI_COMMAND_PREFIXES = ("WN", "SNAP", "MANSNAP", "NOOP")
+
+def valid_command(command) -> bool:
+    """
+    Check a command from outside (e.g. Android) before it goes on the command ring: a short ASCII string that
+    command_follower knows, anything else would be rejected by the ring or crash command_follower
+    """
+    return (isinstance(command, str) and command.isascii() and 0 < len(command) <= MAX_COMMAND_LENGTH
+            and (command[:2] in STM32_PREFIXES or command.startswith(STM32_PREFIXES_OTHER + PI_COMMAND_PREFIXES)
+                 or command == "FIN"))
+
+@lru_cache(maxsize=None)
+def fw_chunks(dist: int) -> Tuple[str, ...]:
+    """
+    Split a forward move into STM32 commands of at most 99 cm, e.g. 230 -> ("FW99", "FW99", "FW32")
+    """
+    full, rest = divmod(dist, 99)
+    if rest or not full:
+        return ("FW99",) * full + (f"FW{rest:02d}",)
+    return ("FW99",) * full
+
+
+# fixed messages to Android, built once and reused for every send
+MSG_READY = AndroidMessage('info', 'Robot is ready!')
+MSG_RUNNING = AndroidMessage('status', 'running')
+MSG_FINISHED = AndroidMessage('status', 'finished')
+MSG_MODE = {0: AndroidMessage('mode', 'manual'), 1: AndroidMessage('mode', 'path')}
+MSG_STARTING_PATH = AndroidMessage('info', 'Starting robot on path!')
+MSG_STARTING_FASTEST_CAR = AndroidMessage('info', 'Starting robot on fastest car!')
+MSG_COMMANDS_FINISHED = AndroidMessage('info', 'Commands queue finished.')
+
+class Arrow(IntEnum):
+    """
+    Arrow recognised on an obstacle, by image id, converted from the API's string id once in rec_image
+    """
+
+    OTHER = 0 # not an arrow, or recognition failed
+    RIGHT = 38
+    LEFT = 39
+
+
+# image-rec API image id -> Arrow, any other id is Arrow.OTHER
+ARROW_IMAGE_IDS = {"38": Arrow.RIGHT, "39": Arrow.LEFT}
+
+# hardcoded paths around the obstacles, tuples so they are built once at import
+PATH_FIRST_RIGHT = ("FR30", "FL30", "FL30", "FR30")
+PATH_FIRST_LEFT = ("FL30", "FR30", "FR30", "FL30")
+PATH_TURN_RIGHT = ("FR30",)
+PATH_TURN_LEFT = ("FL30",)
+PATH_SECOND_ALONG_RIGHT = ("FL30", "FW10") # along the width of obstacle 2 after passing it on the right
+PATH_SECOND_ALONG_LEFT = ("FR30", "FW10")
+PATH_HOME_SAMULA_RIGHT = ("BL30", "FW30", "FL30") # return_home, if there is an obstacle in the way after a Right Arrow
+PATH_HOME_SAMULA_LEFT = ("BR30", "FW30", "FR30")
+
+
+class SecondObstaclePaths(NamedTuple):
+    """
+    Everything that differs between going round obstacle 2 on the right and on the left
+    """
+
+    turn: Tuple[str, ...] # first turn past obstacle 2, and the last turn to face the carpark
+    turn_back: Tuple[str, ...] # turn across the back of obstacle 2, and back towards home
+    ir_side: str # IR sensor facing obstacle 2, "L" or "R"
+    along: Tuple[str, ...]
+    samula: Tuple[str, ...]
+
+
+# anything that is not a Left Arrow goes round obstacle 2 on the right
+SECOND_OBSTACLE_RIGHT = SecondObstaclePaths(PATH_TURN_RIGHT, PATH_TURN_LEFT, "L", PATH_SECOND_ALONG_RIGHT, PATH_HOME_SAMULA_RIGHT)
+SECOND_OBSTACLE_LEFT = SecondObstaclePaths(PATH_TURN_LEFT, PATH_TURN_RIGHT, "R", PATH_SECOND_ALONG_LEFT, PATH_HOME_SAMULA_LEFT)
+
+# outdoorsify's replacements, precomputed so each command is one dict lookup.
+# for turns, only replace regular 3-1 turns (TL00), with outdoor-calibrated 3-1 turns (TL20)
+# large turns (TL30) do not need to be changed, as they are already calibrated for outdoors.
+# straight moves use the outdoor variants, FWxx -> FSxx and BWxx -> BSxx (also the open-ended FW--/BW--)
+OUTDOOR_COMMANDS = {
+    **{turn: turn[:2] + "20" for turn in ("FL00", "FR00", "BL00", "BR00")},
+    **{move + dist: outdoor + dist
+       for move, outdoor in (("FW", "FS"), ("BW", "BS"))
+       for dist in [f"{i:02d}" for i in range(100)] + ["--"]},
+}
+
+# fastest_car samples the US this many times, one per set_us_flag tick, to measure the gap to obstacle 2
+US_SAMPLES = 5
+US_SAMPLE_INTERVAL = 0.1
+
+# how long wait_for_acknowledgment waits for the STM32 before giving up
+ACK_TIMEOUT = 10
+
+# snaps are taken at this resolution, the YOLOv5 model infers at 640 px anyway,
+# so a full-resolution frame only costs upload time
+SNAP_RESOLUTION = (640, 480)
+SNAP_QUALITY = 75
+
+# location reported to android after each step of add_navigate_path's path, as "x,y,d" for path_queue
+NAV_STEP_LOCATION = "1,1,0"
+
+# how long reconnect_android waits for recv_android to return on its own before killing it
+ANDROID_STOP_TIMEOUT = 1
+
+# the child processes run bound methods sharing the links, queues and events created in __init__,
+# which needs fork, so don't depend on the platform's default start method
+Process = get_context("fork").Process
+
+class SharedState(ctypes.Structure):
+    """
+    Measurements shared between processes, packed into one struct so they share a single mapping.
+    Allocated with RawValue, so there is no lock: every field has exactly one writer
+    """
+
+    _fields_ = [
+        ("ultrasonic_is_clear_samula", ctypes.c_int32),
+        ("total_xdist", ctypes.c_int32),
+        ("total_ytime", ctypes.c_float),
+        ("compensate_ydist", ctypes.c_float), # latest US distance, written by set_us_flag
+        ("between_obstacles_ydist", ctypes.c_int32),
+    ]
+
+
+class PiAction(NamedTuple):
+
+    """
+    Represents an action that the Pi is responsible for:
+    - Changing the robot's mode (manual/path)
+    - Requesting a path from the API
+    - Snapping an image and requesting the image-rec result from the API
+    """
+
+    cat: str
+    value: Any
+
+
+class RaspberryPi:
+    def __init__(self):
+        # prepare logger
+        self.logger = prepare_logger()
+
+        # communication links
+        self.android_link = AndroidLink()
+        self.stm_link = STMLink()
+
+        # for sharing information between child processes
+        manager = Manager()
+
+        # 0: manual, 1: path (default: 1)
+        self.robot_mode = manager.Value('i', 0)
+
+        # events
+        self.android_dropped = Event()  # set when the android link drops
+        self.unpause = Event()  # commands will be retrieved from commands queue when this event is set
+
+        # movement lock, commands will only be sent to STM32 if this is released
+        self.movement_lock = Lock()
+
+        # held by recv_android while it handles a message, so reconnect_android never kills it in the middle of one
+        self.android_handler_lock = Lock()
+
+        # queues, pipe-backed so a put/get does not round-trip through the manager process
+        self.android_queue = Queue()
+        self.rpi_action_queue = Queue()
+        self.command_queue = CommandRing()  # shared-memory ring of short command strings, see command_ring.py
+        self.path_queue = CommandRing()  # "x,y,d" location after each path command, one per command_queue entry
+
+        # define processes
+        self.proc_recv_android = None
+        self.proc_recv_stm32 = None
+        self.proc_android_sender = None
+        self.proc_command_follower = None
+        self.proc_rpi_action = None
+
+        # bumped on every android reconnect, android_sender only stops on the sentinel carrying its own generation
+        self.android_generation = 0
+
+        # define threads
+        self.thread_set_us_flag = None
+
+        # opened on the first snap by the process that snaps, see get_camera
+        self.camera = None
+        self.frame_stream = None  # reused for every snap, see snap
+        self.frames = None
+
+        # keep-alive HTTP session to the APIs, one per process, see get_http
+        self.http = None
+        self.http_pid = None
+
+        # define shared data, all in one lock-free struct, see SharedState
+        self.shared = RawValue(SharedState)
+        self.shared.ultrasonic_is_clear_samula = 1
+
+        # sensor events, shared between processes so movement code can wait on them instead of polling a flag
+        self.us_blocked_event = Event()  # set while the US sees an obstacle within 28 cm
+        self.ir_left_clear_event = Event()  # set while the left IR is clear
+        self.ir_right_clear_event = Event()  # set while the right IR is clear
+        self.ir_left_clear_event.set()
+        self.ir_right_clear_event.set()
+        self._ir_clear_events = {"L": self.ir_left_clear_event, "R": self.ir_right_clear_event}
+
+        # recv_android dispatches on the message category, unknown categories are ignored
+        self._android_handlers = {
+            "mode": self._handle_mode,
+            "manual": self._handle_manual,
+            "obstacles": self._handle_obstacles,
+            "control": self._handle_control,
+            "single-obstacle": self._handle_single_obstacle,
+        }
+
+    def start(self):
+        # Hand the GIL over every 20 ms instead of every 5 ms. Set before forking, so the child processes inherit it.
+        # No thread here needs to preempt a running one sooner: the US thread and the GPIO edge callbacks spend their
+        # time blocked in wait()/sleep(), which releases the GIL straight away
+        sys.setswitchinterval(0.020)
+
+        try:
+            # establish bluetooth connection with Android
+            self.android_link.connect()
+            self.android_queue.put(AndroidMessage('info', 'You are connected to the RPi!'))
+
+            # establish connection with STM32
+            self.stm_link.connect()
+
+            # check api status
+            self.check_api()
+
+            # define processes
+            self.proc_recv_android = Process(target=self.recv_android)
+            self.proc_recv_stm32 = Process(target=self.recv_stm)
+            self.proc_android_sender = Process(target=self.android_sender, args=(self.android_generation,))
+            self.proc_command_follower = Process(target=self.command_follower)
+            self.proc_rpi_action = Process(target=self.rpi_action)
+
+            # start processes
+            self.proc_recv_android.start()
+            self.proc_recv_stm32.start()
+            self.proc_android_sender.start()
+            self.proc_command_follower.start()
+            self.proc_rpi_action.start()
+
+            # define threads
+            self.thread_set_us_flag = threading.Thread(target=self.set_us_flag)
+
+            # start threads
+            self.thread_set_us_flag.start()
+
+            # IR flags are updated from the GPIO edge callbacks as soon as a sensor changes, no polling threads
+            sensors.watch_ir(sensors.leftsensor, self.on_irl_edge)
+            sensors.watch_ir(sensors.rightsensor, self.on_irr_edge)
+
+            self.logger.info("Child Processes started")
+            self.android_queue.put(MSG_READY)
+            self.android_queue.put(MSG_MODE[self.robot_mode.value])
+
+            # buzz STM32 (2 times)
+            self.stm_link.send("ZZ02")
+
+            # reconnect handler to watch over android connection
+            self.reconnect_android()
+
+        except KeyboardInterrupt:
+            self.stop()
+
+    def stop(self):
+        self.android_link.disconnect()
+        self.stm_link.disconnect()
+        self.command_queue.unlink()
+        self.path_queue.unlink()
+        self.logger.info("Program exited!")
+
+    def reconnect_android(self):
+        self.logger.info("Reconnection handler is watching...")
+
+        while True:
+            # wait for android connection to drop
+            self.android_dropped.wait()
+
+            self.logger.error("Android link is down!")
+
+            # buzz STM32 (3 times)
+            self.stm_link.send("ZZ03")
+
+            # stop child processes: recv_android returns on its failed recv(), android_sender on its sentinel.
+            # A process killed inside a queue/ring operation or an Event wait leaves that lock or Event broken for
+            # every other process, so android_sender is never killed, it always reaches its sentinel
+            self.logger.debug("Stopping android child processes")
+            self.android_queue.put(self.android_generation)
+            self.proc_android_sender.join()
+
+            # recv_android can stay stuck in recv() on the dead link. Only kill it there: holding
+            # android_handler_lock, it can't be handling a message (putting on a queue or the ring) meanwhile
+            self.proc_recv_android.join(ANDROID_STOP_TIMEOUT)
+            if self.proc_recv_android.is_alive():
+                with self.android_handler_lock:
+                    if self.proc_recv_android.is_alive():
+                        self.logger.warning(f"recv_android ({self.proc_recv_android.pid}) still in recv(), killing it")
+                        self.proc_recv_android.kill()
+                        self.proc_recv_android.join()
+            self.logger.debug("Android child processes stopped")
+
+            # clean up old sockets
+            self.android_link.disconnect()
+
+            # reconnect
+            self.android_link.connect()
+
+            # recreate android processes
+            self.android_generation += 1
+            self.proc_recv_android = Process(target=self.recv_android)
+            self.proc_android_sender = Process(target=self.android_sender, args=(self.android_generation,))
+
+            # start processes
+            self.proc_recv_android.start()
+            self.proc_android_sender.start()
+
+            self.logger.info("Android child processes restarted")
+            self.android_queue.put(AndroidMessage("info", "You are reconnected!"))
+            self.android_queue.put(MSG_MODE[self.robot_mode.value])
+
+            # buzz STM32 (2 times)
+            self.stm_link.send("ZZ02")
+
+            self.android_dropped.clear()
+
+    def recv_android(self) -> None:
+        while True:
+            msg_str: Optional[str] = None
+            try:
+                msg_str = self.android_link.recv()
+            except OSError:
+                self.android_dropped.set()
+                self.logger.debug("Event set: Android connection dropped")
+                return # reconnect_android starts a new recv_android on the new connection
+
+            # if an error occurred in recv()
+            if msg_str is None:
+                continue
+
+            message: dict = json_loads(msg_str)
+
+            self.logger.debug(f"message: {message}")
+
+            handler = self._android_handlers.get(message['cat'])
+            if handler is not None:
+                # handlers only queue work and return, anything long-running goes to rpi_action
+                with self.android_handler_lock:
+                    # robot_mode is a manager proxy, read it once per message rather than in every check
+                    handler(message, self.robot_mode.value)
+
+    def _handle_mode(self, message: dict, mode: int) -> None:
+        # change mode command
+        self.rpi_action_queue.put(PiAction(**message))
+        self.logger.debug(f"Change mode PiAction added to queue: {message}")
+
+    def _handle_manual(self, message: dict, mode: int) -> None:
+        # manual movement commands
+        if mode == 0:  # robot must be in manual mode
+            if message['value'] == "FC01":
+                # run by rpi_action, recv_android has to stay free to notice a dropped link and return
+                self.logger.debug("Task2: Starting Fastest Car")
+                self.rpi_action_queue.put(PiAction(cat="fastest_car", value=""))
+            else:
+                command = message['value']
+                if not valid_command(command):
+                    self.android_queue.put(AndroidMessage("error", f"Unknown manual command: {command}"))
+                    self.logger.warning(f"Ignored unknown manual command: {command}")
+                    return
+
+                try:
+                    self.command_queue.put(command)
+                except (queue.Full, ValueError):
+                    self.android_queue.put(AndroidMessage("error", "Command queue is full, manual command dropped."))
+                    self.logger.warning(f"Command queue full, dropped manual command: {command}")
+                    return
+                self.logger.debug(f"Manual Movement added to command queue: {command}")
+        else:
+            self.android_queue.put(AndroidMessage("error", "Manual movement not allowed in Path mode."))
+            self.logger.warning("Manual movement not allowed in Path mode.")
+
+    def _handle_obstacles(self, message: dict, mode: int) -> None:
+        # set obstacles
+        if mode == 1:  # robot must be in path mode
+            self.rpi_action_queue.put(PiAction(**message))
+            self.logger.debug(f"Set obstacles PiAction added to queue: {message}")
+        else:
+            self.android_queue.put(AndroidMessage("error", "Robot must be in Path mode to set obstacles."))
+            self.logger.warning("Robot must be in Path mode to set obstacles.")
+
+    def _handle_control(self, message: dict, mode: int) -> None:
+        # control commands
+        if message['value'] == "start":
+            # robot must be in path mode
+            if mode == 1:
+                # check api
+                if not self.check_api():
+                    self.logger.error("API is down! Start command aborted.")
+                    self.android_queue.put(AndroidMessage('error', "API is down, start command aborted."))
+
+                    # buzz STM32 (4 times)
+                    self.stm_link.send("ZZ04")
+
+                # commencing path following
+                if not self.command_queue.empty():
+                    self.unpause.set()
+                    self.logger.info("Start command received, starting robot on path!")
+                    self.android_queue.put(MSG_STARTING_PATH)
+                    self.android_queue.put(MSG_RUNNING)
+                else:
+                    self.logger.warning("The command queue is empty, please set obstacles.")
+                    self.android_queue.put(
+                        AndroidMessage("error", "Command queue is empty, did you set obstacles?"))
+            else:
+                self.android_queue.put(
+                    AndroidMessage("error", "Robot must be in Path mode to start robot on path."))
+                self.logger.warning("Robot must be in Path mode to start robot on path.")
+
+    def _handle_single_obstacle(self, message: dict, mode: int) -> None:
+        # navigate around obstacle
+        if mode == 1:  # robot must be in path mode
+            self.rpi_action_queue.put(PiAction(**message))
+            self.logger.debug(f"Single-obstacle PiAction added to queue: {message}")
+        else:
+            self.android_queue.put(
+                AndroidMessage("error", "Robot must be in Path mode to set single obstacle."))
+            self.logger.warning("Robot must be in Path mode to set single obstacle.")
+
+    def recv_stm(self) -> None:
+        """
+        Receive acknowledgement messages from STM32, and release the movement lock
+        """
+        while True:
+            message: str = self.stm_link.recv()
+
+            # acknowledgement from STM32
+            if message.startswith("ACK"):
+                # the command in flight is finished, wakes up wait_for_movement()
+                self.command_queue.task_done()
+
+                # release movement lock
+                try:
+                    self.movement_lock.release()
+                    self.logger.debug("ACK from STM32 received, movement lock released.")
+
+                    # if in path mode, get new location and notify android
+                    if self.robot_mode.value == 1:
+                        x, y, d = self.path_queue.get_nowait().split(",")
+                        location = {
+                            "x": int(x),
+                            "y": int(y),
+                            "d": int(d),
+                        }
+                        self.android_queue.put(AndroidMessage('location', location))
+                    else:
+                        if message == "ACK|X":
+                            self.logger.debug("Fastest car ACK received from STM32!")
+                            self.android_queue.put(AndroidMessage("info", "Robot has completed fastest car!"))
+                            self.android_queue.put(MSG_FINISHED)
+                except Exception:
+                    self.logger.warning("Tried to release a released lock!")
+            else:
+                self.logger.warning(f"Ignored unknown message from STM: {message}")
+
+    def android_sender(self, generation: int) -> None:
+        """
+        Responsible for retrieving messages from the outgoing message queue and sending them over the Android Link.
+        Returns when reconnect_android puts this sender's generation number on the queue
+        """
+        while True:
+            # retrieve from queue, blocks until there is something to send (drops are handled by the OSError below
+            # and the stop sentinel, so there is no need to wake up periodically)
+            message = self.android_queue.get()
+
+            if isinstance(message, int):
+                # stop sentinel, skip any left over from a sender that had to be killed
+                if message == generation:
+                    return
+                continue
+
+            # send it over the android link
+            try:
+                self.android_link.send(message)
+            except OSError:
+                self.android_dropped.set()
+                self.logger.debug("Event set: Android dropped")
+
+    def command_follower(self) -> None:
+        while True:
+            # retrieve next movement command
+            command: str = self.command_queue.get()
+
+            # wait for unpause event to be true
+            # self.unpause.wait()
+
+            # acquire lock first (needed for both moving, and snapping pictures)
+            self.movement_lock.acquire()
+
+            # STM32 commands
+            if command[:2] in STM32_PREFIXES or command.startswith(STM32_PREFIXES_OTHER):
+                #number =int(command[2:])
+                # sent one at a time on purpose: movement_lock is only released by the STM32's ACK, and the
+                # STM32 parses one command per frame, so there is never a second command ready to batch with
+                self.stm_link.send(command)
+                # print("Command sent to STM: ", command)
+                continue # marked done by recv_stm on its ACK
+
+            elif command.startswith("WN"):
+                # self.stm_link.send(command)
+                self.android_queue.put(MSG_RUNNING)
+                self.android_queue.put(MSG_STARTING_FASTEST_CAR)
+                
+            # snap command (path mode)
+            elif command.startswith("SNAP"):
+                obstacle_id = command[4:] # strip the "SNAP" prefix
+                self.rpi_action_queue.put(PiAction(cat="snap", value=obstacle_id))
+
+            # snap command (manual mode)
+            elif command.startswith("MANSNAP"):
+                obstacle_id = "99"
+                self.rpi_action_queue.put(PiAction(cat="snap", value=obstacle_id))
+
+            # no-op (a workaround to let the robot stop after a non-bullseye face has been found)
+            elif command.startswith("NOOP"):
+                # self.stm_link.send("FW00")
+                self.movement_lock.release()
+
+            # end of path
+            elif command == "FIN":
+                self.stm_link.send("ZZ01")
+                # clear the unpause event (no new command will be retrieved from queue)
+                self.unpause.clear()
+                self.movement_lock.release()
+                self.logger.info("Commands queue finished.")
+                self.android_queue.put(MSG_COMMANDS_FINISHED)
+                self.android_queue.put(MSG_FINISHED)
+                self.rpi_action_queue.put(PiAction(cat="stitch", value=""))
+            else:
+                raise Exception(f"Unknown command: {command}")
+
+            # no ACK comes back for Pi-side commands, they are done once handled
+            self.command_queue.task_done()
+    
+    def set_us_flag(self) -> None:
+        obstacle_count_short = 0
+        obstacle_count_long = 0
+
+        # looked up once, the loop below then only touches locals
+        distance = sensors.distance
+        monotonic = time.monotonic
+        sleep = time.sleep
+        shared = self.shared
+        us_blocked_event = self.us_blocked_event
+        blocked = us_blocked_event.is_set()
+
+        next_reading = monotonic()
+        while True:
+            # wait for the next 100 ms tick, so the time spent measuring does not stretch the period
+            next_reading += 0.1
+            delay = next_reading - monotonic()
+            if delay > 0:
+                sleep(delay)
+            else:
+                next_reading = monotonic() # fell behind, don't fire a burst of readings to catch up
+
+            dist = distance()
+            if dist < 0: # no echo within the timeout, skip this reading
+                continue
+
+            shared.compensate_ydist = dist # MAY HAVE TO DELETE THIS!
+            if self.logger.isEnabledFor(logging.DEBUG): # skip building the record at all at 10 Hz unless debugging
+                self.logger.debug("Task2: Ultrasonic Distance = %s", dist)
+
+            # if (dist <= 50.0):
+            #     obstacle_count_long += 1
+
+            #     if (dist <= 28.0):
+            #         obstacle_count_short += 1
+            #     else:
+            #         obstacle_count_short = 0
+            #         self.ultrasonic_is_clear.value = 1
+            #     if (obstacle_count_short == 2):
+            #         self.ultrasonic_is_clear.value = 0
+            #     if (obstacle_count_long == 2):
+            #         self.shared.ultrasonic_is_clear_samula = 0
+            # else:
+            #     obstacle_count_long = 0
+            #     self.shared.ultrasonic_is_clear_samula = 1
+
+            # time.sleep(0.1)
+
+
+            # only touch the event when the state changes, set()/clear() take its cross-process lock every time
+            if (dist <= 28.0): # Change threshold accordingly
+                obstacle_count_short += 1
+            else:
+                obstacle_count_short = 0
+                if blocked:
+                    us_blocked_event.clear()
+                    blocked = False
+
+            if obstacle_count_short == 2 and not blocked:
+                us_blocked_event.set()
+                blocked = True
+
+    def move_until_obstacle_us(self): # Not Threaded
+        # Testing Code
+        # while True:
+        #     print("\nself.ultrasonic_is_clear.value: ", self.ultrasonic_is_clear.value)
+        #     time.sleep(0.5)
+
+        if not self.us_blocked_event.is_set():
+            self.logger.debug("Task2: Moving forward from US, putting FW-- in command queue")
+            self.command_queue.replace_with("FW--")
+            start_time = time.time()
+        else:
+            start_time = time.time()
+
+        # sleep until set_us_flag sees the obstacle, instead of spinning on the flag
+        self.us_blocked_event.wait()
+        end_time = time.time()
+        self.logger.debug("Task2: Stop from US, putting STOP in command queue")
+        self.command_queue.replace_with("STOP")
+        # self.command_queue.put("BW20")
+        # should save distance travelled to total yDist
+
+        elapsed_time = end_time - start_time
+        self.shared.total_ytime += elapsed_time
+        self.logger.debug("!IMPORTANT: total_ytime = %s", self.shared.total_ytime)
+
+    def on_irl_edge(self, wall) -> None:
+        # called from the GPIO edge callback, wall == 1 means the left IR is clear
+        if wall:
+            self.ir_left_clear_event.set()
+        else:
+            self.ir_left_clear_event.clear()
+
+    def old_move_past_obstacle_irl(self):
+        self.logger.debug("move_past_obstacle_irl start")
+        if not self.ir_left_clear_event.is_set(): # If not clear, move indefinitely
+            self.logger.debug("Task2: Moving forward from IR, putting FW-- in command queue")
+            self.command_queue.replace_with("FW--")
+
+        self.ir_left_clear_event.wait()
+        self.logger.debug("Task2: Stop from IR Left, putting STOP in command queue")
+        self.command_queue.replace_with("STOP")
+        # self.command_queue.put("FW10")
+        # self.command_queue.put("BW20")
+        # should save distance travelled to total yDist
+
+    def _move_past_obstacle(self, side: str, trailing: bool = True):
+        """
+        Move forward in FW10 steps until the IR sensor on the given side ("L" or "R") no longer sees the obstacle.
+        trailing adds one more FW10 to make sure the robot is fully past it
+        """
+        clear_event = self._ir_clear_events[side]
+
+        if not clear_event.is_set(): # If not clear, move FW10
+            self.logger.debug("Task2: Moving forward from IR %s, putting FW10 in command queue", side)
+            self.clear_queues() # CHECK IF NEED DELETE THIS!!
+
+        while not clear_event.is_set():
+            self.command_queue.put("FW10")
+            self.shared.total_xdist += 10
+
+            # let the FW10 finish before checking the IR again
+            self.wait_for_movement()
+
+        if trailing:
+            self.command_queue.put("FW10") # CHECK THIS! ADDED TO MAKE SURE CLEAR OBSTACLE 2
+            self.shared.total_xdist += 10 # CHECK THIS! ADDED TO MAKE SURE CLEAR OBSTACLE 2
+
+    def move_past_obstacle_irl(self):
+        self._move_past_obstacle("L")
+
+    def move_past_obstacle_irl_long(self):
+        self._move_past_obstacle("L", trailing=False)
+
+    def on_irr_edge(self, wall) -> None:
+        # called from the GPIO edge callback, wall == 1 means the right IR is clear
+        if wall:
+            self.ir_right_clear_event.set()
+        else:
+            self.ir_right_clear_event.clear()
+    
+    def move_past_obstacle_irr(self):
+        self._move_past_obstacle("R")
+
+    def move_past_obstacle_irr_long(self):
+        self._move_past_obstacle("R", trailing=False)
+
+    def clear_first_obstacle(self, first_arrow_dir: Arrow):
+        # Left Arrow goes round the left, Right Arrow (and anything unrecognised) round the right
+        hardcoded_path = PATH_FIRST_LEFT if first_arrow_dir is Arrow.LEFT else PATH_FIRST_RIGHT
+        self.clear_queues()
+        self.command_queue.put_many(hardcoded_path)
+
+    def back_off_second_obstacle(self):
+        # back off a little if stopped too close to obstacle 2 to turn. The same for every arrow,
+        # so fastest_car runs it while the arrow is still being recognised
+        # self.command_queue.put(f"BW{27 - int(compensate):02d}")
+        compensate = self.shared.compensate_ydist
+        self.logger.debug("compensate_ydist: %s", compensate)
+        if compensate < 15.0:
+            self.command_queue.put("BW05")
+            self.wait_for_movement()
+
+    def clear_second_obstacle_p1(self, second_arrow_dir: Arrow):
+        self.logger.debug("clear_second_obstacle_p1(): waiting for ACK")
+        self.wait_for_movement()
+        self.logger.debug("Task2: clear_second_obstacle_p1")
+        paths = SECOND_OBSTACLE_LEFT if second_arrow_dir is Arrow.LEFT else SECOND_OBSTACLE_RIGHT
+
+        self.logger.debug("Task2: clear_second_obstacle_p1 -> Hardcoded %s to command_queue", paths.turn[0])
+        self.clear_queues()
+        self.command_queue.put_many(paths.turn)
+        self.logger.debug("clear_second_obstacle_p1() -> first turn: waiting for ACK")
+        self.wait_for_movement()
+
+        self.logger.debug("Task2: clear_second_obstacle_p1 -> move_past_obstacle_ir %s", paths.ir_side)
+        # self.old_move_past_obstacle_irl()
+        self._move_past_obstacle(paths.ir_side)
+        self.logger.debug("IMPORTANT! total xdist = %s", self.shared.total_xdist)
+
+        self.logger.debug("clear_second_obstacle_p1() -> after move_past_obstacle : waiting for ACK")
+        self.wait_for_movement()
+
+        # Along width of Obstacle 2
+        self.logger.debug("Task2: clear_second_obstacle_p1 -> Hardcoded %s to command_queue", paths.along[0])
+        # self.clear_queues()
+        self.command_queue.put_many(paths.along)
+
+    def clear_second_obstacle_p2(self, second_arrow_dir: Arrow):
+        self.logger.debug("clear_second_obstacle_p2(): waiting for ACK")
+        self.wait_for_movement()
+        self.logger.debug("Task2: clear_second_obstacle_p2")
+        paths = SECOND_OBSTACLE_LEFT if second_arrow_dir is Arrow.LEFT else SECOND_OBSTACLE_RIGHT
+
+        # Along X Axis
+        self.logger.debug("Task2: clear_second_obstacle_p2 -> Hardcoded %s to command_queue, turn to xaxis", paths.turn_back[0])
+        # self.clear_queues()
+        self.command_queue.put_many(paths.turn_back)
+
+        # read once, so the check below and the distance use the same value
+        total_xdist = self.shared.total_xdist
+        doubled_xdist = (total_xdist * 2) + 30
+        if (total_xdist <= 20):
+            doubled_xdist += 20
+        self.logger.debug("!IMPORTANT: MOVING FORWARD BY %s", doubled_xdist)
+
+        self.command_queue.put_many(fw_chunks(doubled_xdist))
+        self.logger.debug("clear_second_obstacle_p2() -> after clearing x-axis: waiting for ACK")
+        self.wait_for_movement()
+
+        self._move_past_obstacle(paths.ir_side, trailing=False)
+    
+    def clear_second_obstacle_p3(self, second_arrow_dir: Arrow):
+        self.logger.debug("clear_second_obstacle_p3() -> before start: waiting for ACK")
+        self.wait_for_movement()
+        self.logger.debug("Task2: clear_second_obstacle_p3")
+        paths = SECOND_OBSTACLE_LEFT if second_arrow_dir is Arrow.LEFT else SECOND_OBSTACLE_RIGHT
+
+        # To Face Back Home
+        self.logger.debug("Task2: clear_second_obstacle_p3 -> Hardcoded %s to command_queue", paths.turn_back[0])
+        # self.clear_queues()
+        self.command_queue.put_many(paths.turn_back)
+
+    def return_home(self, second_arrow_dir: Arrow):
+        self.logger.debug("Task2: return_home() pang kang lo")
+        paths = SECOND_OBSTACLE_LEFT if second_arrow_dir is Arrow.LEFT else SECOND_OBSTACLE_RIGHT
+
+        # self.command_queue.put("FW10")
+        # time.sleep(1)
+        # self.shared.total_ytime = self.shared.total_ytime - 0.3
+        # print("!IMPORTANT: total_ytime.value MOVING FORWARD FOR ", self.shared.total_ytime)
+
+        # if (self.shared.total_xdist <= 20):
+        #     self.shared.total_xdist = self.shared.total_xdist + 10
+
+        # self.command_queue.put("FW--")
+        # print("return home() -> going straight: sleeping for ", self.shared.total_ytime," seconds")
+        # time.sleep(self.shared.total_ytime)
+        # self.command_queue.put("STOP")
+
+        # Final Turns to Go Home
+        self.wait_for_movement()
+        local_ydist = self.shared.between_obstacles_ydist
+        self.logger.debug("!YOYO: PUTTING FW %s", local_ydist)
+        # self.command_queue.put(f"FW{local_ydist:02d}")
+        
+        self.command_queue.put_many(fw_chunks(local_ydist))
+
+        self.wait_for_movement()
+
+        self.clear_queues()
+        self.command_queue.put_many(paths.turn_back)
+
+        self.wait_for_movement()
+        ultrasonic_is_clear_samula = self.shared.ultrasonic_is_clear_samula
+        self.logger.debug("ultrasonic_is_clear_samula.value is %s", ultrasonic_is_clear_samula)
+        # check for obstacle using US
+        if (ultrasonic_is_clear_samula == 0):
+            self.logger.debug("return home() -> samula code: waiting for ACK")
+            self.wait_for_movement()
+
+            # if there is an obstacle, back off diagonally and go round it
+            self.command_queue.put_many(paths.samula)
+            self.logger.debug("return home() -> samula code: waiting for ACK")
+            self.wait_for_movement()
+        else:
+            self.logger.debug("#CHECK! SAMULA DID NOT HAPPEN")
+
+        single_xdist = int((self.shared.total_xdist * 2) / 4)
+        single_xdist += 20
+        self.logger.debug("!IMPORTANT: MOVING FORWARD BY %s", single_xdist)
+        self.command_queue.put_many(fw_chunks(single_xdist))
+
+        self.wait_for_movement()
+        self.command_queue.put_many(paths.turn)
+        self.logger.debug("return home() -> after facing carpark : waiting for ACK")
+        self.wait_for_movement()
+
+        # print("\nTask2: calling self.move_until_obstacle_us()")
+        # self.move_until_obstacle_us()
+
+    def return_home_2(self):
+        self.logger.debug("Task2: return_home_2() pang kang lo")
+
+        if not self.us_blocked_event.is_set():
+            self.logger.debug("Task2: FINAL Moving forward from US, putting FW-- in command queue")
+            self.command_queue.put("FW--")
+
+        self.us_blocked_event.wait()
+        self.logger.debug("Task2: FINAL Stop from US, putting STOP in command queue")
+        self.command_queue.replace_with("STOP")
+
+
+    def detect_arrow_image(self):
+        obstacle_id = "_1_obstacle"
+        arrow_direction = self.snap_and_rec_2(obstacle_id)
+        return arrow_direction
+
+    def get_http(self) -> requests.Session:
+        """
+        Return this process's HTTP session, so repeated API calls reuse the same connection.
+        A session inherited over fork is replaced, its pooled sockets belong to the parent
+        """
+        if self.http is None or self.http_pid != os.getpid():
+            self.http = requests.Session()
+            # two hosts (status API and image API), a couple of connections each is plenty
+            self.http.mount("http://", HTTPAdapter(pool_connections=2, pool_maxsize=4))
+            self.http_pid = os.getpid()
+        return self.http
+
+    def get_camera(self) -> picamera.PiCamera:
+        """
+        Open the camera on first use and keep it open, so only the first snap pays for the init and warm-up.
+        It lives as long as the process that snaps (rpi_action), which releases it on exit
+        """
+        if self.camera is None:
+            # capture at the snap size rather than resizing, so the sensor mode keeps the 4:3 aspect ratio
+            self.camera = picamera.PiCamera(resolution=SNAP_RESOLUTION)
+            self.camera.start_preview()
+            time.sleep(1) # let AWB/exposure settle
+
+            # one continuous capture session, each next() grabs a still from the running video port instead of
+            # switching the camera into still mode and letting AWB reconverge every time
+            self.frame_stream = io.BytesIO()
+            self.frames = self.camera.capture_continuous(
+                self.frame_stream, format='jpeg', use_video_port=True, quality=SNAP_QUALITY)
+        return self.camera
+
+    def snap_and_rec_2(self, obstacle_id: str) -> Arrow:
+        return self.rec_image(self.snap(), obstacle_id)
+
+    def snap(self) -> io.BytesIO:
+        # capture an image, over the previous one as it has been uploaded by now
+        self.get_camera()
+        self.frame_stream.seek(0)
+        self.frame_stream.truncate()
+        return next(self.frames)
+
+    def rec_image(self, stream: io.BytesIO, obstacle_id: str) -> Arrow:
+        self.logger.info("Image captured. Calling image-rec api...")
+        # release lock so that bot can continue moving
+        # self.movement_lock.release()
+
+        # call image-rec API endpoint
+        self.logger.debug("Requesting from image API")
+        url = f"http://{API_IMAGE_IP}:{API_IMAGE_PORT}/image"
+        filename = f"{int(time.time())}_{obstacle_id}.jpg"
+        # upload straight from the stream instead of copying the JPEG out with getvalue()
+        stream.seek(0)
+        response = self.get_http().post(url, files={"file": (filename, stream, "image/jpeg")})
+
+        if response.status_code != 200:
+            self.logger.error("Something went wrong when requesting path from image-rec API. Please try again.")
+            self.android_queue.put(AndroidMessage(
+                "error", "Something went wrong when requesting path from image-rec API. Please try again."))
+            return Arrow.OTHER
+
+        results = json.loads(response.content)
+        # self.android_queue.put(AndroidMessage("image-rec", results))
+        # return results
+
+        # response_data = response.json()
+        image_id = results['image_id']
+        return ARROW_IMAGE_IDS.get(image_id, Arrow.OTHER)
+
+    def fastest_car(self):
+        xdist = 0 # left/right
+        ydist = 0 # forward/backward
+
+        # Obstacle 1 code
+        self.logger.debug("Task2: calling self.move_until_obstacle_us()")
+        self.move_until_obstacle_us()
+
+        self.logger.debug("fastest_car() : waiting for ACK")
+        self.wait_for_movement()
+
+        self.logger.debug("Task2: calling self.detect_arrow_image()")
+        first_arrow_dir = self.detect_arrow_image()
+        self.logger.debug("Task2: first_arrow_dir = %s", first_arrow_dir)
+
+        self.logger.debug("Task2: calling clear_first_obstacle()")
+        self.clear_first_obstacle(first_arrow_dir)
+
+        self.logger.debug("fastest_car() -> after clear_first_obstacle() : waiting for ACK")
+        self.wait_for_movement()
+
+        # OBSTACLE 2 CODE ONWARDS
+        # self.shared.between_obstacles_ydist = self.shared.compensate_ydist
+
+        # the robot is already stopped (ACKed), only wait for one set_us_flag tick taken standing still
+        time.sleep(US_SAMPLE_INTERVAL)
+        # special_ydist = 0
+        # set_us_flag refreshes compensate_ydist every 100 ms, so sampling any slower only adds waiting
+        max_list = []
+        for i in range(US_SAMPLES):
+            ydist = int(self.shared.compensate_ydist)
+            if ydist < 150: # further than that is a missed echo, not obstacle 2
+                max_list.append(ydist)
+            time.sleep(US_SAMPLE_INTERVAL)
+        # fall back to 100 if every sample was out of range
+        self.shared.between_obstacles_ydist = max(max_list, default=100) + 70
+
+        self.logger.debug("Task2: calling self.move_until_obstacle_us()")
+        self.move_until_obstacle_us()
+        
+        # snap only once the STOP is ACKed, so the robot is standing still for the frame
+        self.logger.debug("fastest_car() -> before snapping obstacle 2 : waiting for ACK")
+        self.wait_for_movement()
+
+        # recognise the second arrow in the background while backing off, it is only needed for the first turn
+        self.logger.debug("Task2: snapping obstacle 2")
+        stream = self.snap()
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            arrow_future = pool.submit(self.rec_image, stream, "_1_obstacle")
+            self.back_off_second_obstacle()
+            second_arrow_dir = arrow_future.result()
+        self.logger.debug("Task2: second_arrow_dir = %s", second_arrow_dir)
+
+        self.logger.debug("Task2: calling clear_second_obstacle_p1()")
+        self.clear_second_obstacle_p1(second_arrow_dir)
+
+        self.logger.debug("Task2: calling clear_second_obstacle_p2()")
+        self.clear_second_obstacle_p2(second_arrow_dir)
+
+        self.logger.debug("Task2: calling clear_second_obstacle_p3()")
+        self.clear_second_obstacle_p3(second_arrow_dir)
+
+        self.logger.debug("fastest_car() -> after clear_second_obstacle_p3() : waiting for ACK")
+        self.wait_for_movement()
+
+        self.logger.debug("Task2: calling return_home()")
+        self.return_home(second_arrow_dir)
+
+        self.wait_for_movement()
+        self.return_home_2()
+
+        self.wait_for_movement()
+        self.stm_link.send("ZZ02")
+        
+
+    
+    def wait_for_movement(self, timeout: float = 20) -> bool:
+        """
+        Block until the STM32 has acknowledged every command queued so far, instead of sleeping for a guessed duration.
+        timeout is only a safety cap in case an ACK is lost. Returns False if it was hit
+        """
+        start = time.monotonic()
+        if self.command_queue.join(timeout):
+            # the real duration of each move, to see how long the STM32 actually takes
+            self.logger.debug("STM32 ACKed after %.2fs", time.monotonic() - start)
+            return True
+        self.logger.warning(f"No ACK from STM32 after {timeout}s, carrying on")
+        return False
+
+    def wait_for_acknowledgment(self) -> bool:
+        """
+        Waits for acknowledgment (ACK) from STM32 after sending a command.
+        Returns True if acknowledgment received within ACK_TIMEOUT, otherwise False.
+        Blocks on command_queue's all_done event, which recv_stm sets on the last outstanding ACK, so nothing polls
+        """
+        return self.wait_for_movement(ACK_TIMEOUT)
+
+    def rpi_action(self):
+        while True:
+            action: PiAction = self.rpi_action_queue.get()
+            self.logger.debug(f"PiAction retrieved from queue: {action.cat} {action.value}")
+
+            if action.cat == "mode":
+                self.change_mode(action.value)
+            elif action.cat == "single-obstacle":
+                self.add_navigate_path()
+            elif action.cat == "stitch":
+                self.request_stitch()
+            elif action.cat == "fastest_car":
+                self.fastest_car()
+
+    def change_mode(self, new_mode):
+        # if robot already in correct mode
+        if new_mode == "manual" and self.robot_mode.value == 0:
+            self.android_queue.put(AndroidMessage('error', 'Robot already in Manual mode.'))
+            self.logger.warning("Robot already in Manual mode.")
+        elif new_mode == "path" and self.robot_mode.value == 1:
+            self.android_queue.put(AndroidMessage('error', 'Robot already in Path mode.'))
+            self.logger.warning("Robot already in Path mode.")
+        else:
+            # change robot mode
+            self.robot_mode.value = 0 if new_mode == 'manual' else 1
+
+            # clear command, path queues
+            self.clear_queues()
+
+            # set unpause event, so that robot can freely move
+            if new_mode == "manual":
+                self.unpause.set()
+            else:
+                self.unpause.clear()
+
+            # release movement lock, if it was previously acquired
+            try:
+                self.movement_lock.release()
+            except Exception:
+                self.logger.warning("Tried to release a released lock!")
+
+            # notify android
+            self.android_queue.put(AndroidMessage('info', f'Robot is now in {new_mode.title()} mode.'))
+            self.logger.info(f"Robot is now in {new_mode.title()} mode.")
+
+            # buzz stm32 (1 time)
+            self.stm_link.send("ZZ01")
+
+    def clear_queues(self):
+        # both are rings, so clearing only moves their head index, nothing is read out and dropped one by one
+        self.command_queue.clear()
+        self.path_queue.clear()
+
+    def check_api(self) -> bool:
+        url = f"http://{API_IP}:{API_PORT}/status"
+        try:
+            response = self.get_http().get(url, timeout=1)
+            if response.status_code == 200:
+                self.logger.debug("API is up!")
+                return True
+        except ConnectionError:
+            self.logger.warning("API Connection Error")
+            return False
+        except requests.Timeout:
+            self.logger.warning("API Timeout")
+            return False
+        except Exception as e:
+            self.logger.warning(f"API Exception: {e}")
+            return False
+
+    def request_stitch(self):
+        url = f"http://{API_IMAGE_IP}:{API_IMAGE_PORT}/stitch"
+        response = self.get_http().get(url)
+
+        # error encountered at the server, return early
+        if response.status_code != 200:
+            # notify android
+            self.android_queue.put(AndroidMessage("error", "Something went wrong when requesting stitch from the API."))
+            self.logger.error("Something went wrong when requesting stitch from the API.")
+            return
+
+        self.logger.info("Images stitched!")
+        self.android_queue.put(AndroidMessage("info", "Images stitched!"))
+
+    def add_navigate_path(self):
+        # our hardcoded path
+        hardcoded_path: List[str] = [
+            "DT20", "SNAPS", "NOOP",
+            "FR00", "FL00", "FW30", "BR00", "FW10", "SNAPE", "NOOP",
+            "FR00", "FL00", "FW30", "BR00", "FW10", "SNAPN", "NOOP",
+            "FR00", "FL00", "FW30", "BR00", "FW10", "SNAPW", "NOOP",
+            "FIN"
+        ]
+
+        # put commands and paths into queues
+        self.clear_queues()
+        self.command_queue.put_many(hardcoded_path)
+        self.path_queue.put_many((NAV_STEP_LOCATION,) * len(hardcoded_path))
+
+        self.logger.info("Navigate-around-obstacle path loaded. Robot is ready to move.")
+        self.android_queue.put(AndroidMessage("info", "Navigate-around-obstacle path loaded. Robot is ready to move."))
+
+    @staticmethod
+    def outdoorsify(original):
+        # anything not in the table (e.g. large turns) is already fine outdoors, see OUTDOOR_COMMANDS
+        return OUTDOOR_COMMANDS.get(original, original)
+
+
+if __name__ == "__main__":
+    rpi = RaspberryPi()
+    rpi.start()
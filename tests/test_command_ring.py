@@ -0,0 +1,96 @@
+import queue
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from command_ring import CommandRing
+
+
+class CommandRingTest(unittest.TestCase):
+    def setUp(self):
+        self.ring = CommandRing(capacity=8)
+
+    def tearDown(self):
+        self.ring.unlink()
+
+    def take_and_ack(self):
+        command = self.ring.get_nowait()
+        self.ring.task_done()
+        return command
+
+    def test_put_get_in_order(self):
+        self.ring.put_many(("FW10", "FR30", "BW05"))
+        self.assertEqual([self.ring.get_nowait() for _ in range(3)], ["FW10", "FR30", "BW05"])
+        self.assertTrue(self.ring.empty())
+
+    def test_put_raises_full(self):
+        self.ring.put_many(["FW10"] * 8)
+        with self.assertRaises(queue.Full):
+            self.ring.put("FW10")
+        with self.assertRaises(queue.Full):
+            self.ring.put_many(("FW10",))
+
+    def test_get_nowait_raises_empty(self):
+        with self.assertRaises(queue.Empty):
+            self.ring.get_nowait()
+
+    def test_join_after_every_command_done(self):
+        self.ring.put_many(("FW10", "FR30"))
+        self.assertFalse(self.ring.join(0))
+        self.take_and_ack()
+        self.assertFalse(self.ring.join(0))
+        self.take_and_ack()
+        self.assertTrue(self.ring.join(0))
+
+    def test_stray_task_done_ignored(self):
+        self.ring.task_done()
+        self.ring.put("FW10")
+        self.ring.task_done()  # not taken by get() yet
+        self.assertFalse(self.ring.join(0))
+        self.take_and_ack()
+        self.assertTrue(self.ring.join(0))
+
+    def test_clear_counts_dropped_commands_done(self):
+        self.ring.put_many(("FW10", "FR30", "BW05"))
+        self.ring.get_nowait()
+        self.ring.clear()
+        with self.assertRaises(queue.Empty):
+            self.ring.get_nowait()
+        self.assertFalse(self.ring.join(0))  # FW10 is still in flight
+        self.ring.task_done()
+        self.assertTrue(self.ring.join(0))
+
+    def test_replace_with_drops_queued_commands(self):
+        self.ring.put_many(("FW10", "FW10", "FW10"))
+        self.ring.get_nowait()
+        self.ring.replace_with("STOP")
+        self.ring.task_done()  # ACK of the FW10 in flight
+        self.assertEqual(self.take_and_ack(), "STOP")
+        with self.assertRaises(queue.Empty):
+            self.ring.get_nowait()
+        self.assertTrue(self.ring.join(0))
+
+        # the ring keeps working afterwards
+        self.ring.put("FW10")
+        self.take_and_ack()
+        self.assertTrue(self.ring.join(0))
+
+    def test_replace_with_on_empty_ring(self):
+        self.ring.replace_with("STOP")
+        self.assertEqual(self.take_and_ack(), "STOP")
+        self.assertTrue(self.ring.join(0))
+
+    def test_counters_wrap_around_the_slots(self):
+        for _ in range(40):
+            self.ring.put_many(("FW10", "FR30"))
+            self.ring.get_nowait()
+            self.ring.replace_with("STOP")
+            self.ring.task_done()
+            self.assertEqual(self.take_and_ack(), "STOP")
+            self.assertTrue(self.ring.join(0))
+
+
+if __name__ == "__main__":
+    unittest.main()